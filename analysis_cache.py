@@ -0,0 +1,109 @@
+import hashlib
+import json
+import sqlite3
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+from importlib import metadata
+
+from datastructures import Article, Token
+
+
+@lru_cache(maxsize=None)
+def model_version(analyzer: str) -> str:
+    """Version installée de l'analyseur, sans importer le modèle"""
+    try:
+        return metadata.version(analyzer)
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+class AnalysisCache:
+    """Cache SQLite des tokens produits par un analyseur.
+
+    La clé est un hachage du titre et de la description de l'article, du nom de l'analyseur
+    et de la version du modèle : un article déjà analysé la veille n'est pas réanalysé.
+    La taille totale est bornée, les entrées les moins récemment utilisées sont évincées.
+    """
+
+    def __init__(self, path: Path, max_size: int = 512 * 1024 * 1024, commit_every: int = 100):
+        self.path = path
+        self.max_size = max_size
+        self.commit_every = commit_every
+        self._uncommitted = 0
+        self.hits = 0
+        self.misses = 0
+        # Utilisé par une seule étape à la fois, mais pas forcément dans le fil qui l'a ouvert (pipeline.py)
+        self._connection = sqlite3.connect(str(path), check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS tokens ("
+            "key TEXT PRIMARY KEY, tokens BLOB NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS tokens_last_used ON tokens (last_used)")
+        (total,) = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM tokens").fetchone()
+        self._total_size = total
+
+    @staticmethod
+    def key(article: Article, analyzer: str, version: str) -> str:
+        """Clé de cache d'un article pour un analyseur et une version de modèle"""
+        content = "\0".join((analyzer, version, article.title or "", article.description or ""))
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[list[Token]]:
+        """Retourne les tokens en cache, ou None si l'article n'a jamais été analysé"""
+        row = self._connection.execute("SELECT tokens FROM tokens WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._connection.execute("UPDATE tokens SET last_used = ? WHERE key = ?", (time.time(), key))
+        return [Token(text, lemma, pos) for text, lemma, pos in json.loads(row[0])]
+
+    def put(self, key: str, tokens) -> None:
+        """Enregistre les tokens d'un article, puis évince si la taille maximale est dépassée"""
+        data = json.dumps([(token.text, token.lemma, token.pos) for token in tokens],
+                          ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        row = self._connection.execute("SELECT size FROM tokens WHERE key = ?", (key,)).fetchone()
+        if row is not None:
+            self._total_size -= row[0]
+        self._connection.execute(
+            "INSERT OR REPLACE INTO tokens (key, tokens, size, last_used) VALUES (?, ?, ?, ?)",
+            (key, data, len(data), time.time())
+        )
+        self._total_size += len(data)
+        if self._total_size > self.max_size:
+            self._evict()
+        self._uncommitted += 1
+        if self._uncommitted >= self.commit_every:
+            self.commit()
+
+    def _evict(self) -> None:
+        """Supprime les entrées les moins récemment utilisées jusqu'à 90 % de la taille maximale"""
+        target = self.max_size * 0.9
+        evicted = []
+        for key, size in self._connection.execute("SELECT key, size FROM tokens ORDER BY last_used"):
+            if self._total_size <= target:
+                break
+            evicted.append((key,))
+            self._total_size -= size
+        self._connection.executemany("DELETE FROM tokens WHERE key = ?", evicted)
+
+    def stats(self) -> dict:
+        """Statistiques du cache : succès, échecs, nombre d'entrées et taille en octets"""
+        (entries,) = self._connection.execute("SELECT COUNT(*) FROM tokens").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "size": self._total_size}
+
+    def commit(self) -> None:
+        self._connection.commit()
+        self._uncommitted = 0
+
+    def close(self) -> None:
+        self.commit()
+        self._connection.close()
+
+    def __enter__(self) -> 'AnalysisCache':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -1,11 +1,35 @@
 import argparse
-import os
-from datastructures import Corpus, Article, Token
-#from trankit import Pipeline
-import stanza
+from datastructures import Article, Token, name_to_iterator, name_to_writer
+from analysis_cache import AnalysisCache, model_version
+from ressources import exiger_stanza
 from pathlib import Path
-import json
-import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator
+
+# Cache persistant des résultats d'analyse (désactivé tant que set_analysis_cache n'est pas appelé)
+_analysis_cache = None
+
+def set_analysis_cache(cache):
+    """Active (ou désactive avec None) le cache persistant des analyses"""
+    global _analysis_cache
+    _analysis_cache = cache
+
+def _from_cache(article: Article, analyzer: str) -> bool:
+    """Applique à l'article les tokens en cache ; retourne False s'il reste à analyser"""
+    if _analysis_cache is None:
+        return False
+    tokens = _analysis_cache.get(AnalysisCache.key(article, analyzer, model_version(analyzer)))
+    if tokens is None:
+        return False
+    article.tokens = tokens
+    return True
+
+def _to_cache(article: Article, analyzer: str) -> None:
+    """Enregistre les tokens d'un article analysé avec succès"""
+    if _analysis_cache is not None and article.tokens:
+        _analysis_cache.put(AnalysisCache.key(article, analyzer, model_version(analyzer)), article.tokens)
 
 # Cache pour le pipeline Trankit pour éviter de le charger plusieurs fois
 _pipeline = None
@@ -14,6 +38,8 @@ def get_pipeline():
     """Charge et retourne le pipeline Trankit"""
     global _pipeline
     if _pipeline is None:
+        # Import différé : une analyse avec Stanza n'a pas à charger Trankit, et inversement
+        from trankit import Pipeline
         _pipeline = Pipeline('french', gpu=False)
         _pipeline.add('english')
     return _pipeline
@@ -24,6 +50,8 @@ def analyze_with_trankit(article: Article) -> Article:
     text = f"{article.title} {article.description}"
     if not text.strip():
         return article  # Si le texte est vide, retourner l'article non modifié
+    if _from_cache(article, "trankit"):
+        return article
     
     p = get_pipeline()
     try:
@@ -41,80 +69,214 @@ def analyze_with_trankit(article: Article) -> Article:
                 tokens.append(token)
         # Ajoute les tokens à l'article
         article.tokens = tokens
+        _to_cache(article, "trankit")
     except Exception as e:
         print(f"Erreur lors de l'analyse de l'article {article.id}: {e}")
 
     return article
 
 def load_model_stanza() :
-    stanza_dir = str(Path.home()) + "/stanza_resources/fr/"
-    if not os.path.isdir(stanza_dir):
-        stanza.download('fr') 
-    else :
-        print('Model already downloaded')
+    exiger_stanza('fr')
+
 
+# Cache pour le pipeline Stanza : chargé une seule fois par processus
+_stanza_pipeline = None
+
+def get_stanza_pipeline(check_model: bool = True):
+    """Charge et retourne le pipeline Stanza (check_model=False : modèle déjà vérifié par l'appelant)"""
+    global _stanza_pipeline
+    if _stanza_pipeline is None:
+        import stanza
+        if check_model:
+            load_model_stanza()
+        _stanza_pipeline = stanza.Pipeline('fr', processors='tokenize,mwt,pos,lemma', verbose=False)
+    return _stanza_pipeline
+
+def _stanza_tokens(doc) -> list[Token]:
+    """Convertit un document Stanza analysé en liste de Token"""
+    tokens = []
+    for sentence in doc.sentences : 
+        for word in sentence.words :
+            tokens.append(Token(word.text, word.lemma, word.pos))
+    return tokens
+
+def _stanza_article(nlp, article: Article) -> bool:
+    """Analyse un article avec le pipeline, sans passer par le cache ; retourne False en cas d'erreur"""
+    try:
+        article.tokens = _stanza_tokens(nlp(f"{article.title} {article.description}"))
+        return True
+    except Exception as e:
+        print(f"Erreur lors de l'analyse de l'article {article.id} avec Stanza: {e}")
+        return False
 
 def analyse_stanza(article:Article) -> Article :
 
-    load_model_stanza()
-    nlp = stanza.Pipeline('fr', processors='tokenize,mwt,pos,lemma', verbose=False)
     text = f"{article.title} {article.description}"
     if not text.strip():
         return article
+    if _from_cache(article, "stanza"):
+        return article
 
-    try:
-        doc = nlp(text)
-
-        tokens = []
-        for sentence in doc.sentences : 
-            for word in sentence.words :
-                tokens.append(Token(word.text, word.lemma, word.pos))
-        article.tokens = tokens
-    except Exception as e:
-        print(f"Erreur lors de l'analyse de l'article {article.id} avec Stanza: {e}")
+    if _stanza_article(get_stanza_pipeline(), article):
+        _to_cache(article, "stanza")
     
     return article
 
+def analyse_stanza_batch(articles: list[Article]) -> list[Article]:
+    """Analyse un lot d'articles en un seul appel au pipeline Stanza (API multi-documents)"""
+    to_analyse = [article for article in articles if f"{article.title} {article.description}".strip()]
+    if not to_analyse:
+        return articles
+
+    import stanza
+    nlp = get_stanza_pipeline()
+    try:
+        in_docs = [stanza.Document([], text=f"{article.title} {article.description}") for article in to_analyse]
+        out_docs = nlp(in_docs)
+        for article, doc in zip(to_analyse, out_docs):
+            article.tokens = _stanza_tokens(doc)
+    except Exception as e:
+        # En cas d'échec du lot, on retombe sur l'analyse article par article ; le cache reste
+        # l'affaire de l'appelant (iter_analyse_stanza)
+        print(f"Erreur lors de l'analyse d'un lot avec Stanza: {e}")
+        for article in to_analyse:
+            _stanza_article(nlp, article)
+
+    return articles
+
+def _batches(articles: Iterable[Article], batch_size: int) -> Iterator[list[Article]]:
+    """Regroupe un flux d'articles en lots de batch_size articles"""
+    batch = []
+    for article in articles:
+        batch.append(article)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def _init_stanza_worker():
+    """Initialise un processus de travail : pipeline chargé une fois, pas d'accès au cache du parent.
+
+    Le modèle a été vérifié (et téléchargé au besoin) par le parent avant la création du pool.
+    """
+    set_analysis_cache(None)
+    get_stanza_pipeline(check_model=False)
+
+def iter_analyse_stanza(articles: Iterable[Article], batch_size: int = 32, workers: int = 1) -> Iterator[Article]:
+    """Analyse un flux d'articles par lots avec Stanza et les produit dans l'ordre du corpus.
+
+    Les articles déjà en cache ne sont pas envoyés au modèle.
+    Avec workers > 1, les lots sont répartis sur un pool de processus ayant chacun son pipeline ;
+    le nombre de lots en cours est borné pour garder une mémoire constante.
+    """
+    def split(batch):
+        # Rangs des articles du lot absents du cache
+        return [i for i, article in enumerate(batch) if not _from_cache(article, "stanza")]
+
+    def merge(batch, missing, analysed):
+        for i, article in zip(missing, analysed):
+            batch[i] = article
+            _to_cache(article, "stanza")
+        return batch
+
+    if workers <= 1:
+        for batch in _batches(articles, batch_size):
+            missing = split(batch)
+            yield from merge(batch, missing, analyse_stanza_batch([batch[i] for i in missing]))
+        return
+
+    # Une seule vérification, dans le parent : pas de téléchargements concurrents, et une
+    # ressource absente hors ligne arrête le programme au lieu de casser le pool
+    load_model_stanza()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_stanza_worker) as executor:
+        pending = deque()
+        for batch in _batches(articles, batch_size):
+            missing = split(batch)
+            pending.append((batch, missing, executor.submit(analyse_stanza_batch, [batch[i] for i in missing])))
+            if len(pending) >= 2 * workers:
+                batch, missing, future = pending.popleft()
+                yield from merge(batch, missing, future.result())
+        while pending:
+            batch, missing, future = pending.popleft()
+            yield from merge(batch, missing, future.result())
+
+# Analyzers applied one article at a time
+analyzer_func = {"trankit": analyze_with_trankit}
+
+def iter_analyse(articles: Iterable[Article], analyzer: str, batch_size: int = 32, workers: int = 1) -> Iterator[Article]:
+    """Analyze a stream of articles with the given analyzer, yielding them in corpus order"""
+    if analyzer == "stanza":
+        return iter_analyse_stanza(articles, batch_size=batch_size, workers=workers)
+    if analyzer in analyzer_func:
+        return (analyzer_func[analyzer](article) for article in articles)
+    return iter(articles)
+
 def main():
     parser = argparse.ArgumentParser(description="Analyse linguistique de corpus avec Trankit")
     parser.add_argument("input_file", help="Input file containing filtered articles corpus")
     parser.add_argument("analyzer", choices=["trankit", "spacy", "stanza"], help="Choice of syntax analyzer to use")
-    parser.add_argument("save", choices=["json", "xml", "pickle"], help="Output format for saving the analysis")
+    parser.add_argument("save", choices=["json", "xml", "pickle", "binary"], help="Output format for saving the analysis")
+    parser.add_argument("--compact", action="store_true", help="Compact JSON output (one article per line)")
+    parser.add_argument("--batch-size", type=int, default=32, help="Number of articles sent to Stanza at once")
+    parser.add_argument("--workers", type=int, default=1, help="Number of Stanza worker processes")
+    parser.add_argument("--cache", default="analysis_cache.sqlite", help="Persistent analysis cache file")
+    parser.add_argument("--cache-max-mb", type=int, default=512, help="Maximum analysis cache size in MB")
+    parser.add_argument("--no-cache", action="store_true", help="Disable the persistent analysis cache")
+    parser.add_argument("--output", "-o", help="Output file (default: output_analyzed.<save>)")
     args = parser.parse_args()
     
-    # Load corpus based on specified format
+    # Stream corpus based on specified format
     input_path = Path(args.input_file)
     if ".json" in args.input_file:
-        corpus = Corpus.load_json(input_path)
+        articles = name_to_iterator["json"](input_path)
     elif ".xml" in args.input_file:
-        corpus = Corpus.load_xml(input_path)
+        articles = name_to_iterator["xml"](input_path)
     elif ".pickle" in args.input_file:
-        corpus = Corpus.load_pickle(input_path)
-    
+        articles = name_to_iterator["pickle"](input_path)
+    elif ".bin" in args.input_file:
+        articles = name_to_iterator["binary"](input_path)
+
+    cache = None
+    if not args.no_cache:
+        cache = AnalysisCache(Path(args.cache), max_size=args.cache_max_mb * 1024 * 1024)
+        set_analysis_cache(cache)
+
     # Analyze articles with the specified analyzer
-    if args.analyzer == "trankit":
-        print(f"Analyzing {len(corpus.articles)} articles with Trankit...")
-        for i, article in enumerate(corpus.articles):
-            if i % 10 == 0:  # Display progress every 10 articles
-                print(f"Analyzing article {i+1}/{len(corpus.articles)}")
-            analyze_with_trankit(article)
-    elif args.analyzer == "stanza" :
-        print(f"Analyzing {len(corpus.articles)} articles with Stanza...")
-        for i, article in enumerate(corpus.articles):
-            if i % 10 == 0:  # Display progress every 10 articles
-                print(f"Analyzing article {i+1}/{len(corpus.articles)}")
-            analyse_stanza(article)
-
-    # Save the analyzed corpus in specified format
-    output_filename = f"output_analyzed.{args.save}"
+    nb_analyzed = 0
+
+    def analyzed_articles():
+        nonlocal nb_analyzed
+        if args.analyzer == "stanza":
+            print(f"Analyzing articles with Stanza (batch size {args.batch_size}, {args.workers} worker(s))...")
+        elif args.analyzer in analyzer_func:
+            print(f"Analyzing articles with {args.analyzer.capitalize()}...")
+        else:
+            yield from articles
+            return
+        for article in iter_analyse(articles, args.analyzer, batch_size=args.batch_size, workers=args.workers):
+            if nb_analyzed % 10 == 0:  # Display progress every 10 articles
+                print(f"Analyzing article {nb_analyzed+1}")
+            nb_analyzed += 1
+            yield article
+
+    # Save the analyzed corpus in specified format, as articles are produced
+    output_filename = args.output or f"output_analyzed.{args.save}"
     print(f"Saving analyzed corpus to {output_filename}...")
-    
+
+    start = time.perf_counter()
     if args.save == "json":
-        corpus.save_json(output_filename)
-    elif args.save == "xml":
-        corpus.save_xml(output_filename)
-    elif args.save == "pickle":
-        corpus.save_pickle(output_filename)
+        name_to_writer["json"](analyzed_articles(), output_filename, compact=args.compact)
+    else:
+        name_to_writer[args.save](analyzed_articles(), output_filename)
+    elapsed = time.perf_counter() - start
+    if nb_analyzed:
+        print(f"{nb_analyzed} articles analyzed in {elapsed:.1f}s ({nb_analyzed / elapsed:.2f} articles/second)")
+    if cache is not None:
+        stats = cache.stats()
+        print(f"Analysis cache: {stats['hits']} hits, {stats['misses']} misses, "
+              f"{stats['entries']} entries ({stats['size'] / 1024 / 1024:.1f} MB)")
+        cache.close()
     
     print("Analysis completed successfully!")
 
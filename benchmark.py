@@ -0,0 +1,336 @@
+"""
+Banc d'essai des implémentations interchangeables du projet :
+lecteurs RSS (regex / etree / feedparser), parcours de dossiers (glob / os / path)
+et formats de sérialisation (xml / json / pickle / binary), ainsi que le temps de démarrage
+de chaque CLI (`--help`) comparé à son budget.
+
+Les données sont synthétiques (flux de 1k à 1M items, arborescences de profondeur et largeur
+réglables, corpus riches en tokens). Chaque cas est exécuté dans un processus neuf pour mesurer
+son pic de mémoire ; les résultats (débit, pic RSS, durées médiane et extrêmes des répétitions)
+sont écrits en JSON.
+
+Exemple : python3 benchmark.py --sizes 1000 10000 --repeat 3 --output bench.json
+"""
+import argparse
+import json
+import math
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from multiprocessing import get_context
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+from datastructures import Article, Corpus, Token, name_to_loader, name_to_writer
+
+READERS = ("regex", "etree", "feedparser")
+WALKERS = ("glob", "os", "path")
+FORMATS = ("xml", "json", "pickle", "binary")
+
+# Budget de démarrage de chaque CLI, en secondes (médiane de `python <cli> --help`) :
+# aucune n'importe la pile NLP ni ne charge de modèle avant d'en avoir besoin
+STARTUP_BUDGETS = {"datastructures.py": 0.3, "rss_reader.py": 0.3, "rss_parcours.py": 0.3,
+                   "analyzers.py": 0.4, "run_lda.py": 0.4, "bertopicdemo.py": 0.4}
+HEAVY_MODULES = ("numpy", "gensim", "nltk", "spacy", "stanza", "trankit", "torch", "sentence_transformers",
+                 "bertopic", "umap", "hdbscan", "sklearn", "feedparser")
+
+# Exécute une CLI avec --help puis affiche, en JSON, les modules lourds qu'elle a importés
+_SONDE_DEMARRAGE = """
+import json, os, runpy, sys
+sys.argv = [sys.argv[1], "--help"]
+stdout = sys.stdout
+sys.stdout = open(os.devnull, "w")
+try:
+    runpy.run_path(sys.argv[0], run_name="__main__")
+except SystemExit:
+    pass
+sys.stdout = stdout
+print(json.dumps(sorted(m for m in %r if m in sys.modules)))
+""" % (HEAVY_MODULES,)
+
+_MOTS = ("politique", "économie", "gouvernement", "réforme", "marché", "santé", "climat", "élection",
+         "entreprise", "culture", "sport", "justice", "europe", "budget", "école", "énergie")
+_POS = ("NOUN", "VERB", "ADJ", "DET", "ADP", "PRON", "PUNCT", "PROPN")
+_SOURCES = ("Le Monde", "Le Figaro", "Libération", "France Info", "Blast")
+
+
+def _phrase(rng, n_mots):
+    return " ".join(rng.choice(_MOTS) for _ in range(n_mots))
+
+
+def _date(rng):
+    return time.strftime("%a, %d %b %Y %H:%M:%S +0100", time.gmtime(rng.randint(1735689600, 1767225599)))
+
+
+def generer_flux(path, n_items, seed=0):
+    """Écrit un flux RSS synthétique de n_items items (CDATA, entités, catégories) et retourne son chemin"""
+    rng = random.Random(seed)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('<?xml version="1.0" encoding="utf-8"?>\n<rss version="2.0"><channel>')
+        f.write(f"<title>{rng.choice(_SOURCES)}</title><category>Actualités</category>\n")
+        for i in range(n_items):
+            f.write(
+                f"<item><title>{escape(_phrase(rng, 8))} &amp; {i}</title>"
+                f"<link>https://example.org/{seed}/{i}</link>"
+                f"<description><![CDATA[<p>{_phrase(rng, 40)}</p>]]></description>"
+                f"<pubDate>{_date(rng)}</pubDate>"
+                + "".join(f"<category>{rng.choice(_MOTS).capitalize()}</category>" for _ in range(rng.randint(0, 3)))
+                + "</item>\n"
+            )
+        f.write("</channel></rss>\n")
+    return path
+
+
+def generer_arborescence(racine, profondeur, largeur, items_par_fichier=10, seed=0):
+    """Crée une arborescence de `largeur` sous-dossiers et `largeur` fichiers XML par niveau ; retourne le nombre de fichiers"""
+    racine = Path(racine)
+    racine.mkdir(parents=True, exist_ok=True)
+    n_fichiers = 0
+    for i in range(largeur):
+        generer_flux(racine / f"flux_{i}.xml", items_par_fichier, seed=seed * 1000 + i)
+        (racine / f"notes_{i}.txt").write_text("pas un flux\n")
+        n_fichiers += 1
+    if profondeur > 0:
+        for i in range(largeur):
+            n_fichiers += generer_arborescence(racine / f"dossier_{i}", profondeur - 1, largeur,
+                                               items_par_fichier, seed=seed * 10 + i + 1)
+    return n_fichiers
+
+
+def generer_corpus(n_articles, tokens_par_article=0, seed=0):
+    """Corpus synthétique, éventuellement riche en tokens (sortie d'analyseur simulée)"""
+    rng = random.Random(seed)
+    articles = []
+    for i in range(n_articles):
+        tokens = [Token(mot, mot, rng.choice(_POS)) for mot in (rng.choice(_MOTS) for _ in range(tokens_par_article))]
+        articles.append(Article(
+            id=f"https://example.org/{i}",
+            source=f"{rng.choice(_SOURCES)}.xml",
+            title=_phrase(rng, 8),
+            description=_phrase(rng, 40),
+            date=_date(rng),
+            categories=[rng.choice(_MOTS).capitalize() for _ in range(rng.randint(0, 3))],
+            tokens=tokens
+        ))
+    return Corpus(articles)
+
+
+def percentile(valeurs, p):
+    """Percentile par rang le plus proche"""
+    valeurs = sorted(valeurs)
+    if not valeurs:
+        return None
+    rang = max(0, math.ceil(p / 100 * len(valeurs)) - 1)
+    return valeurs[rang]
+
+
+def _reinitialiser_pic():
+    """Ramène le pic RSS du processus à sa mémoire actuelle (Linux) ; retourne False si c'est impossible.
+
+    Le pic (ru_maxrss, VmHWM) est hérité à travers fork/exec : sans remise à zéro, un processus
+    neuf partirait du pic de son parent.
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _rss_mb():
+    """Pic RSS du processus, en Mo"""
+    try:
+        with open("/proc/self/status") as f:
+            for ligne in f:
+                if ligne.startswith("VmHWM:"):
+                    return int(ligne.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss est en kilo-octets sous Linux, en octets sous macOS
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss / (1024 * 1024) if sys.platform == "darwin" else maxrss / 1024
+
+
+def _preparer(couche, implementation, chemin):
+    """Prépare (hors chronométrage) la fonction à mesurer et retourne (fonction, nombre d'éléments traités)"""
+    if couche == "readers":
+        import rss_reader
+        lire = {"regex": rss_reader.lire_rss_regex, "etree": rss_reader.lire_rss_etree,
+                "feedparser": rss_reader.lire_rss_feedparser}[implementation]
+        return (lambda: len(lire(chemin))), None
+    if couche == "walkers":
+        import rss_parcours
+        parcourir = {"glob": rss_parcours.lire_corpus_glob, "os": rss_parcours.lire_corpus_os,
+                     "path": rss_parcours.lire_corpus_path}[implementation]
+        return (lambda: len(parcourir(chemin))), None
+    if couche == "savers":
+        corpus = Corpus.load_pickle(chemin)
+        sortie = f"{chemin}.{implementation}"
+        ecrire = name_to_writer[implementation]
+        return (lambda: ecrire(corpus.articles, sortie)), len(corpus.articles)
+    if couche == "loaders":
+        return (lambda: len(name_to_loader[implementation](chemin).articles)), None
+    raise ValueError(f"Couche inconnue : {couche}")
+
+
+def executer_cas(couche, implementation, chemin, repetitions):
+    """Exécute un cas (dans un processus neuf) et retourne ses mesures"""
+    try:
+        fonction, n_elements = _preparer(couche, implementation, chemin)
+    except ImportError as e:
+        return {"error": f"dépendance absente : {e}"}
+    # Le pic mesuré est celui du cas seul, données d'entrée (préparées ci-dessus) comprises
+    pic_reinitialise = _reinitialiser_pic()
+    rss_avant = _rss_mb()
+    durees = []
+    stdout = sys.stdout
+    # Les fonctions mesurées affichent des messages de progression
+    sys.stdout = open(os.devnull, "w")
+    try:
+        for _ in range(repetitions):
+            debut = time.perf_counter()
+            n = fonction()
+            durees.append(time.perf_counter() - debut)
+            n_elements = n_elements if n_elements is not None else n
+    except Exception as e:
+        return {"error": repr(e)}
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+    mediane = percentile(durees, 50)
+    return {
+        "items": n_elements,
+        "runs": repetitions,
+        "throughput": n_elements / mediane if mediane else None,
+        # Durées d'une exécution complète : quelques répétitions ne font pas une distribution de latence
+        "duration_s": {"median": mediane, "min": min(durees), "max": max(durees)},
+        "peak_rss_mb": round(_rss_mb(), 1),
+        "peak_rss_delta_mb": round(_rss_mb() - rss_avant, 1),
+        # Sans remise à zéro (hors Linux), le pic peut être celui du processus parent
+        "peak_rss_reset": pic_reinitialise,
+    }
+
+
+def mesurer_demarrage(cli, repetitions):
+    """Temps de démarrage d'une CLI (`--help`, interpréteur compris) et modules lourds importés"""
+    durees = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        sortie = subprocess.run([sys.executable, "-c", _SONDE_DEMARRAGE, cli], capture_output=True, text=True,
+                                cwd=Path(__file__).resolve().parent)
+        durees.append(time.perf_counter() - debut)
+        if sortie.returncode != 0:
+            return {"error": sortie.stderr.strip().splitlines()[-1] if sortie.stderr.strip() else sortie.returncode}
+    mediane = percentile(durees, 50)
+    return {
+        "runs": repetitions,
+        "duration_s": {"median": mediane, "min": min(durees), "max": max(durees)},
+        "budget_s": STARTUP_BUDGETS[cli],
+        "within_budget": mediane <= STARTUP_BUDGETS[cli],
+        "heavy_imports": json.loads(sortie.stdout.strip().splitlines()[-1]),
+    }
+
+
+def executer_isole(couche, implementation, chemin, repetitions):
+    """Lance un cas dans un processus neuf (spawn) ; son pic RSS est remis à zéro avant la mesure"""
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as executor:
+        return executor.submit(executer_cas, couche, implementation, str(chemin), repetitions).result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Banc d'essai des lecteurs, parcours et sérialiseurs")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000],
+                        help="Nombres d'items des flux et d'articles des corpus (jusqu'à 1000000)")
+    parser.add_argument("--layers", nargs="+", default=["readers", "walkers", "serializers", "startup"],
+                        choices=["readers", "walkers", "serializers", "startup"], help="Couches à mesurer")
+    parser.add_argument("--clis", nargs="+", default=list(STARTUP_BUDGETS), choices=list(STARTUP_BUDGETS),
+                        help="CLI dont le démarrage est mesuré")
+    parser.add_argument("--readers", nargs="+", default=list(READERS), choices=READERS)
+    parser.add_argument("--walkers", nargs="+", default=list(WALKERS), choices=WALKERS)
+    parser.add_argument("--formats", nargs="+", default=list(FORMATS), choices=FORMATS)
+    parser.add_argument("--depth", type=int, default=2, help="Profondeur de l'arborescence générée")
+    parser.add_argument("--fanout", type=int, default=4, help="Sous-dossiers et fichiers par dossier")
+    parser.add_argument("--tokens", type=int, default=50, help="Tokens par article des corpus générés")
+    parser.add_argument("--repeat", type=int, default=3, help="Répétitions de chaque mesure")
+    parser.add_argument("--workdir", help="Dossier des données générées (temporaire par défaut)")
+    parser.add_argument("--output", "-o", help="Fichier JSON des résultats (sortie standard par défaut)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.workdir) as dossier:
+        dossier = Path(dossier)
+        resultats = []
+
+        def noter(couche, implementation, taille, chemin):
+            print(f"{couche:<12} {implementation:<10} {taille:>8}", end=" ", file=sys.stderr, flush=True)
+            mesure = executer_isole(couche, implementation, chemin, args.repeat)
+            mesure.update({"layer": couche, "implementation": implementation, "size": taille})
+            resultats.append(mesure)
+            if "error" in mesure:
+                print(f"erreur : {mesure['error']}", file=sys.stderr)
+            else:
+                print(f"{mesure['throughput']:>12.0f} /s  {mesure['peak_rss_mb']:>8.1f} MB", file=sys.stderr)
+
+        if "readers" in args.layers:
+            for taille in args.sizes:
+                flux = generer_flux(dossier / f"flux_{taille}.xml", taille)
+                for implementation in args.readers:
+                    noter("readers", implementation, taille, flux)
+
+        if "walkers" in args.layers:
+            arborescence = dossier / "arborescence"
+            n_fichiers = generer_arborescence(arborescence, args.depth, args.fanout, items_par_fichier=1)
+            for implementation in args.walkers:
+                noter("walkers", implementation, n_fichiers, arborescence)
+
+        if "serializers" in args.layers:
+            for taille in args.sizes:
+                source = dossier / f"corpus_{taille}.pickle"
+                corpus = generer_corpus(taille, args.tokens)
+                with redirect_stdout(sys.stderr):
+                    corpus.save_pickle(source)
+                del corpus
+                for implementation in args.formats:
+                    noter("savers", implementation, taille, source)
+                    noter("loaders", implementation, taille, f"{source}.{implementation}")
+
+        if "startup" in args.layers:
+            for cli in args.clis:
+                print(f"{'startup':<12} {cli:<20}", end=" ", file=sys.stderr, flush=True)
+                mesure = mesurer_demarrage(cli, args.repeat)
+                mesure.update({"layer": "startup", "implementation": cli})
+                resultats.append(mesure)
+                if "error" in mesure:
+                    print(f"erreur : {mesure['error']}", file=sys.stderr)
+                else:
+                    print(f"{mesure['duration_s']['median']:>6.3f} s / {mesure['budget_s']} s"
+                          f"{'' if mesure['within_budget'] else '  HORS BUDGET'}"
+                          f"{'  ' + ', '.join(mesure['heavy_imports']) if mesure['heavy_imports'] else ''}",
+                          file=sys.stderr)
+
+    rapport = {
+        "python": sys.version.split()[0],
+        "platform": sys.platform,
+        "parameters": {"sizes": args.sizes, "depth": args.depth, "fanout": args.fanout,
+                       "tokens": args.tokens, "repeat": args.repeat},
+        "results": resultats,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(rapport, f, ensure_ascii=False, indent=2)
+    else:
+        json.dump(rapport, sys.stdout, ensure_ascii=False, indent=2)
+
+    # Code de retour non nul si une CLI dépasse son budget de démarrage
+    if any(mesure.get("within_budget") is False for mesure in resultats):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
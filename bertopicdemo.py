@@ -1,104 +1,496 @@
-from bertopic import BERTopic
+from datastructures import Corpus, Article, name_to_iterator
+from ressources import stopwords_nltk
+import argparse
+import copy
+import json
+import os
+import random
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
 
-from sklearn.datasets import fetch_20newsgroups
+#import spacy
 
-from datastructures import Corpus, Article
-import argparse
+EMBEDDING_MODEL_NAME = 'sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2'
 
-from sentence_transformers import SentenceTransformer
-from umap import UMAP
-from hdbscan import HDBSCAN
-from nltk.corpus import stopwords
-from sklearn.feature_extraction.text import CountVectorizer
-from bertopic.vectorizers import ClassTfidfTransformer
-from bertopic.representation import KeyBERTInspired
+# Les modèles sont construits au premier usage et non à l'import : --help et les erreurs
+# d'arguments ne chargent ni torch, ni UMAP, ni HDBSCAN
+_embedding_model = None
 
-#import spacy
+def get_embedding_model():
+    """Charge et retourne le modèle d'embeddings"""
+    global _embedding_model
+    if _embedding_model is None:
+        from sentence_transformers import SentenceTransformer
+        _embedding_model = SentenceTransformer(EMBEDDING_MODEL_NAME)
+    return _embedding_model
+
+def build_topic_model():
+    """Construit le modèle BERTopic et son vectoriseur"""
+    from bertopic import BERTopic
+    from bertopic.representation import KeyBERTInspired
+    from bertopic.vectorizers import ClassTfidfTransformer
+    from hdbscan import HDBSCAN
+    from sklearn.feature_extraction.text import CountVectorizer
+    from umap import UMAP
+
+    # Step 1 - Extract embeddings
+    embedding_model = get_embedding_model()
+
+    # Step 2 - Reduce dimensionality
+    umap_model = UMAP(n_neighbors=15, n_components=5, min_dist=0.0, metric='cosine')
+
+    # Step 3 - Cluster reduced embeddings
+    hdbscan_model = HDBSCAN(min_cluster_size=5, metric='euclidean', cluster_selection_method='eom', prediction_data=True)
+
+    # Step 4 - Tokenize topics
+    french_stopwords = list(stopwords_nltk("french"))
+    vectorizer_model = CountVectorizer(stop_words=french_stopwords)
+
+    # Step 5 - Create topic representation
+    ctfidf_model = ClassTfidfTransformer()
+
+    # Step 6 - (Optional) Fine-tune topic representations
+    representation_model = KeyBERTInspired()
+
+    topic_model = BERTopic(
+        language='multilingual',
+        embedding_model=embedding_model,
+        vectorizer_model=vectorizer_model,
+        umap_model=umap_model,
+        hdbscan_model=hdbscan_model,
+        ctfidf_model=ctfidf_model,
+        representation_model=representation_model
+        )
+    return topic_model, vectorizer_model
+
+
+def build_online_topic_model(n_topics=50, decay=0.01):
+    """Construit un modèle BERTopic apprenable par lots (partial_fit).
+
+    UMAP et HDBSCAN sont remplacés par leurs équivalents incrémentaux (IncrementalPCA, MiniBatchKMeans)
+    et le vectoriseur par OnlineCountVectorizer, dont le vocabulaire grandit et oublie (decay) au fil des lots.
+    """
+    from bertopic import BERTopic
+    from bertopic.vectorizers import ClassTfidfTransformer, OnlineCountVectorizer
+    from sklearn.cluster import MiniBatchKMeans
+    from sklearn.decomposition import IncrementalPCA
+
+    return BERTopic(
+        language='multilingual',
+        embedding_model=get_embedding_model(),
+        umap_model=IncrementalPCA(n_components=5),
+        hdbscan_model=MiniBatchKMeans(n_clusters=n_topics, random_state=0),
+        vectorizer_model=OnlineCountVectorizer(stop_words=list(stopwords_nltk("french")), decay=decay),
+        ctfidf_model=ClassTfidfTransformer(reduce_frequent_words=True)
+        )
+
+def partial_fit_batches(topic_model, docs, embeddings, batch_size, n_topics):
+    """Apprend les documents par lots ; retourne le thème de chaque document.
+
+    MiniBatchKMeans exige au moins n_topics documents par lot : le dernier lot, s'il est trop
+    petit, est fusionné avec le précédent.
+    """
+    batch_size = max(batch_size, n_topics)
+    bounds = list(range(0, len(docs), batch_size)) + [len(docs)]
+    if len(bounds) > 2 and bounds[-1] - bounds[-2] < n_topics:
+        del bounds[-2]
+    topics = []
+    for start, end in zip(bounds, bounds[1:]):
+        topic_model.partial_fit(docs[start:end], embeddings[start:end])
+        # Après partial_fit, topics_ ne contient que les thèmes du dernier lot
+        topics.extend(topic_model.topics_)
+    return topics
+
+def topic_drift(previous, current):
+    """Compare deux états successifs des thèmes (effectifs et mots principaux par thème)"""
+    total_previous = sum(previous["topic_counts"].values()) or 1
+    total_current = sum(current["topic_counts"].values()) or 1
+    drift = {"new_topics": [], "vanished_topics": [], "word_change": {}, "share_delta": {}}
+    for topic in sorted(current["topic_counts"].keys() | previous["topic_counts"].keys(), key=int):
+        share = current["topic_counts"].get(topic, 0) / total_current
+        previous_share = previous["topic_counts"].get(topic, 0) / total_previous
+        drift["share_delta"][topic] = round(share - previous_share, 4)
+        if topic not in previous["topic_counts"]:
+            drift["new_topics"].append(topic)
+        elif topic not in current["topic_counts"]:
+            drift["vanished_topics"].append(topic)
+    for topic, words in current["top_words"].items():
+        previous_words = set(previous["top_words"].get(topic, ()))
+        if previous_words:
+            # 1 - Jaccard des mots principaux : 0 si le thème est inchangé, 1 s'il a été entièrement remplacé
+            drift["word_change"][topic] = round(1 - len(previous_words & set(words)) / len(previous_words | set(words)), 4)
+    return drift
+
+def run_online(model_path: Path, docs, embeddings, label, batch_size=1000, n_topics=50, decay=0.01):
+    """Intègre les documents du jour au modèle en ligne persistant et ajoute une entrée au rapport de dérive"""
+    from bertopic import BERTopic
+
+    if len(docs) < n_topics:
+        print(f"Erreur : {len(docs)} documents, il en faut au moins {n_topics} (--online-topics) pour un lot")
+        return None
+
+    if model_path.exists():
+        topic_model = BERTopic.load(str(model_path), embedding_model=get_embedding_model())
+        print(f"Modèle en ligne chargé : {model_path}")
+    else:
+        topic_model = build_online_topic_model(n_topics, decay)
+        print(f"Nouveau modèle en ligne : {n_topics} thèmes")
+
+    topics = partial_fit_batches(topic_model, docs, embeddings, batch_size, n_topics)
+
+    counts = {}
+    for topic in topics:
+        counts[str(topic)] = counts.get(str(topic), 0) + 1
+    entry = {
+        "label": label,
+        "documents": len(docs),
+        "topic_counts": counts,
+        "top_words": {topic: [word for word, _ in topic_model.get_topic(int(topic)) or []][:10] for topic in counts},
+    }
+
+    # Le rapport ne relit que le lot précédent : aucun ancien document n'est revisité
+    report_path = model_path.with_name(model_path.name + ".drift.json")
+    report = {"batches": []}
+    if report_path.exists():
+        with open(report_path, encoding="utf-8") as f:
+            report = json.load(f)
+    if report["batches"]:
+        entry["drift"] = topic_drift(report["batches"][-1], entry)
+    report["batches"].append(entry)
+
+    tmp = model_path.with_name(model_path.name + ".tmp")
+    topic_model.save(str(tmp), serialization="pickle", save_embedding_model=False)
+    os.replace(tmp, model_path)
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=4)
 
-# Step 1 - Extract embeddings
-embedding_model = SentenceTransformer('sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2')
+    print(f"{len(docs)} documents intégrés au modèle ({len(counts)} thèmes représentés)")
+    if "drift" in entry:
+        drift = entry["drift"]
+        moved = sorted(drift["word_change"].items(), key=lambda item: item[1], reverse=True)[:5]
+        print(f"Nouveaux thèmes : {drift['new_topics']} ; disparus : {drift['vanished_topics']}")
+        print(f"Thèmes les plus modifiés (1 - Jaccard des mots) : {moved}")
+    print(f"Rapport de dérive : {report_path}")
+    return topic_model
 
-# Step 2 - Reduce dimensionality
-umap_model = UMAP(n_neighbors=15, n_components=5, min_dist=0.0, metric='cosine')
 
-# Step 3 - Cluster reduced embeddings
-hdbscan_model = HDBSCAN(min_cluster_size=5, metric='euclidean', cluster_selection_method='eom', prediction_data=True)
+@contextmanager
+def etape(timings: dict, nom: str):
+    """Chronomètre une étape du traitement (durées cumulées en secondes dans timings)"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[nom] = timings.get(nom, 0.0) + time.perf_counter() - start
+        print(f"[{nom}] {timings[nom]:.1f} s")
 
-# Step 4 - Tokenize topics
-french_stopwords = stopwords.words("french")
-vectorizer_model = CountVectorizer(stop_words=french_stopwords)
+def stratified_sample(strata: list, size: int, seed: int = 0) -> list[int]:
+    """Indices d'un échantillon de taille size, réparti proportionnellement entre les strates.
 
-# Step 5 - Create topic representation
-ctfidf_model = ClassTfidfTransformer()
+    Chaque strate reçoit size * effectif / total documents, arrondis par la méthode du plus fort
+    reste, et au moins un document tant que la taille le permet, pour que les petites sources ou
+    catégories soient représentées dans l'apprentissage des thèmes.
+    """
+    if size >= len(strata):
+        return list(range(len(strata)))
+    groups = {}
+    for index, stratum in enumerate(strata):
+        groups.setdefault(stratum, []).append(index)
+    exact = {stratum: size * len(indices) / len(strata) for stratum, indices in groups.items()}
+    if size < len(groups):
+        # Moins de places que de strates : un document pour chacune des plus grandes
+        quotas = dict.fromkeys(sorted(groups, key=lambda stratum: -exact[stratum])[:size], 1)
+    else:
+        quotas = {stratum: max(1, int(exact[stratum])) for stratum in groups}
+        # Plus forts restes d'abord ; le plancher de 1 peut obliger à reprendre aux strates les plus servies
+        excess = sum(quotas.values()) - size
+        while excess < 0:
+            for stratum in sorted((s for s in groups if quotas[s] < len(groups[s])),
+                                  key=lambda s: quotas[s] - exact[s])[:-excess]:
+                quotas[stratum] += 1
+                excess += 1
+        while excess > 0:
+            for stratum in sorted((s for s in groups if quotas[s] > 1),
+                                  key=lambda s: exact[s] - quotas[s])[:excess]:
+                quotas[stratum] -= 1
+                excess -= 1
+    rng = random.Random(seed)
+    sample = []
+    for stratum, quota in quotas.items():
+        sample.extend(rng.sample(groups[stratum], quota))
+    return sorted(sample)
 
-# Step 6 - (Optional) Fine-tune topic representations
-representation_model = KeyBERTInspired()
+def fit_on_sample(topic_model, docs, embeddings, sample, transform_batch_size, timings):
+    """Apprend les thèmes sur l'échantillon, puis affecte les autres documents par lots.
+
+    L'affectation passe par transform (UMAP.transform et prédiction approchée de HDBSCAN) :
+    seuls les embeddings réduits d'un lot sont en mémoire à la fois.
+    """
+    import numpy as np
+
+    with etape(timings, "fit (échantillon)"):
+        topic_model.fit([docs[i] for i in sample], embeddings[sample])
+    topics = np.full(len(docs), -1, dtype=np.int64)
+    topics[sample] = topic_model.topics_
+
+    in_sample = np.zeros(len(docs), dtype=bool)
+    in_sample[sample] = True
+    with etape(timings, "transform (reste du corpus)"):
+        for start in range(0, len(docs), transform_batch_size):
+            batch = np.flatnonzero(~in_sample[start:start + transform_batch_size]) + start
+            if len(batch):
+                batch_topics, _ = topic_model.transform([docs[i] for i in batch], embeddings[batch])
+                topics[batch] = batch_topics
+    return topics.tolist()
+
+
+def reduce_2d(embeddings, key: str, cache_path: Path, sample=None, batch_size=10000):
+    """Réduction UMAP en 2 dimensions des embeddings, mise en cache sur le disque.
+
+    key identifie les embeddings (articles, ordre et modèle) : la réduction n'est recalculée que si
+    le corpus a changé. Avec sample, UMAP apprend sur l'échantillon et projette le reste par lots.
+    """
+    import numpy as np
+    from umap import UMAP
+
+    key_path = cache_path.with_suffix(".json")
+    if cache_path.exists() and key_path.exists():
+        with open(key_path, encoding="utf-8") as f:
+            if json.load(f).get("key") == key:
+                return np.load(cache_path, mmap_mode="r")
+
+    umap_model = UMAP(n_neighbors=15, n_components=2, min_dist=0.0, metric='cosine')
+    if sample is None:
+        reduced = umap_model.fit_transform(embeddings)
+    else:
+        umap_model.fit(embeddings[sample])
+        reduced = np.vstack([umap_model.transform(embeddings[start:start + batch_size])
+                             for start in range(0, len(embeddings), batch_size)])
+    reduced = np.asarray(reduced, dtype=np.float32)
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    np.save(cache_path, reduced)
+    with open(key_path, "w", encoding="utf-8") as f:
+        json.dump({"key": key}, f)
+    return reduced
+
+def downsample_by_density(coords, topics, max_points: int, grid: int = 100, seed: int = 0):
+    """Indices (triés) d'au plus max_points documents, en éclaircissant les zones denses.
+
+    Le plan est découpé en grid x grid cases ; chaque couple (case, thème) garde au plus le même
+    nombre de points, le plus grand possible dans le budget. Les zones peu denses et les petits
+    thèmes restent donc entièrement visibles, seules les zones saturées perdent des points.
+    """
+    import numpy as np
+
+    topics = np.asarray(topics)
+    n = len(topics)
+    if n <= max_points:
+        return np.arange(n)
+    rng = np.random.default_rng(seed)
+    low, high = coords.min(axis=0), coords.max(axis=0)
+    cells = np.clip(((coords - low) / np.maximum(high - low, 1e-9) * grid).astype(np.int64), 0, grid - 1)
+    keys = (cells[:, 0] * grid + cells[:, 1]) * (topics.max() + 2) + (topics + 1)
+
+    # Ordre aléatoire à l'intérieur de chaque groupe, puis rang de chaque point dans son groupe
+    order = rng.permutation(n)
+    order = order[np.argsort(keys[order], kind="stable")]
+    sorted_keys = keys[order]
+    starts = np.r_[0, np.flatnonzero(np.diff(sorted_keys)) + 1]
+    sizes = np.diff(np.r_[starts, n])
+    ranks = np.arange(n) - np.repeat(starts, sizes)
+
+    # Plus grand plafond par groupe qui tient dans le budget (recherche dichotomique)
+    low_cap, high_cap = 0, int(sizes.max())
+    while low_cap < high_cap:
+        cap = (low_cap + high_cap + 1) // 2
+        if np.minimum(sizes, cap).sum() <= max_points:
+            low_cap = cap
+        else:
+            high_cap = cap - 1
+    if low_cap == 0:
+        # Plus de groupes que de points autorisés : un point par groupe, tiré au hasard
+        return np.sort(rng.choice(order[ranks == 0], max_points, replace=False))
+    return np.sort(order[ranks < low_cap])
+
+def truncate(text: str, max_chars: int) -> str:
+    return text if len(text) <= max_chars else text[:max_chars].rstrip() + "…"
+
+def write_figure(fig, path: str, budget_mb: float, include_plotlyjs) -> float:
+    """Écrit une figure HTML et retourne sa taille en Mo, avec un avertissement au-delà du budget"""
+    fig.write_html(path, include_plotlyjs=include_plotlyjs)
+    size = os.path.getsize(path) / (1024 * 1024)
+    if size > budget_mb:
+        print(f"Attention : {path} fait {size:.1f} Mo (budget {budget_mb} Mo)")
+    return size
+
+def documents_figure(topic_model, docs, reduced, path, max_points, hover_chars, budget_mb, include_plotlyjs):
+    """Carte des documents bornée : sous-échantillonnage par densité et survol tronqué.
+
+    Si le fichier dépasse malgré tout le budget, il est régénéré avec deux fois moins de points.
+    """
+    all_topics = topic_model.topics_
+    while True:
+        keep = downsample_by_density(reduced, all_topics, max_points)
+        hover = [truncate(docs[i], hover_chars) for i in keep]
+        # visualize_documents lit les thèmes dans topics_ : une copie superficielle du modèle reçoit ceux
+        # des documents retenus, sans toucher au modèle partagé avec les autres figures
+        subset_model = copy.copy(topic_model)
+        subset_model.topics_ = [all_topics[i] for i in keep]
+        fig = subset_model.visualize_documents(hover, reduced_embeddings=reduced[keep])
+        fig.write_html(path, include_plotlyjs=include_plotlyjs)
+        size = os.path.getsize(path) / (1024 * 1024)
+        if size <= budget_mb or max_points <= 1000:
+            break
+        max_points //= 2
+    print(f"{path} : {len(keep)} documents sur {len(docs)}, {size:.1f} Mo")
+    return size
+
+def export_visualizations(topic_model, docs, classes_flat, reduced, args):
+    """Génère en parallèle les figures indépendantes ; retourne la taille de chaque fichier en Mo.
+
+    Par défaut, plotly.js est chargé depuis un CDN au lieu d'être recopié (3,5 Mo) dans chaque fichier.
+    """
+    include_plotlyjs = True if args.offline_html else "cdn"
+    budget = args.max_html_mb
+
+    def hierarchy():
+        hierarchical_topics = topic_model.hierarchical_topics(docs)
+        return write_figure(topic_model.visualize_hierarchy(hierarchical_topics=hierarchical_topics),
+                            "hierarchical_topics.html", budget, include_plotlyjs)
+
+    def per_class():
+        topics_per_class = topic_model.topics_per_class(docs, classes=classes_flat)
+        return write_figure(topic_model.visualize_topics_per_class(topics_per_class),
+                            "topics_per_class.html", budget, include_plotlyjs)
+
+    figures = {
+        "hierarchical_topics.html": hierarchy,
+        "topics_per_class.html": per_class,
+        "topics.html": lambda: write_figure(topic_model.visualize_topics(), "topics.html", budget, include_plotlyjs),
+        #Affiche dans une map de chaleur
+        "topics_heatmap.html": lambda: write_figure(topic_model.visualize_heatmap(), "topics_heatmap.html",
+                                                    budget, include_plotlyjs),
+        #Affiche les embeddings
+        "topics_embeddings.html": lambda: documents_figure(topic_model, docs, reduced, "topics_embeddings.html",
+                                                           args.max_points, args.hover_chars, budget, include_plotlyjs),
+    }
+    with ThreadPoolExecutor(max_workers=args.figure_workers) as executor:
+        futures = {name: executor.submit(build) for name, build in figures.items()}
+    sizes = {}
+    for name, future in futures.items():
+        try:
+            sizes[name] = round(future.result(), 2)
+        except Exception as e:
+            print(f"Erreur lors de la génération de {name}: {e}")
+    return sizes
 
 
 def main():
 
     parser = argparse.ArgumentParser(description="Topic modeling")
     parser.add_argument("file", help="Chemin du fichier/dossier contenant le corpus")
-    parser.add_argument("format", choices=["json", "xml", "pickle"], help="Format du corpus")
+    parser.add_argument("format", choices=["json", "xml", "pickle", "binary"], help="Format du corpus")
+    parser.add_argument("--embedding-cache", default="embedding_cache",
+                        help="Dossier du cache des embeddings (seuls les articles nouveaux ou modifiés sont encodés)")
+    parser.add_argument("--no-embedding-cache", action="store_true", help="Encoder toutes les descriptions sans cache")
+    parser.add_argument("--batch-size", type=int, default=256, help="Nombre de descriptions encodées par lot")
+    parser.add_argument("--online", type=Path, metavar="MODELE",
+                        help="Mode en ligne : intégrer le fichier (articles du jour) à ce modèle persistant par partial_fit")
+    parser.add_argument("--online-topics", type=int, default=50, help="Nombre de thèmes du modèle en ligne")
+    parser.add_argument("--online-batch-size", type=int, default=1000, help="Documents par appel à partial_fit")
+    parser.add_argument("--decay", type=float, default=0.01, help="Oubli du vocabulaire du vectoriseur en ligne à chaque lot")
+    parser.add_argument("--label", default=time.strftime("%Y-%m-%d"), help="Étiquette du lot dans le rapport de dérive")
+    parser.add_argument("--sample", type=int,
+                        help="Grand corpus : apprendre les thèmes sur un échantillon stratifié de cette taille, puis affecter le reste par lots")
+    parser.add_argument("--stratify", choices=["source", "categorie"], default="source", help="Strates de l'échantillon")
+    parser.add_argument("--transform-batch-size", type=int, default=10000, help="Documents affectés par lot hors échantillon")
+    parser.add_argument("--timings", type=Path, help="Fichier JSON des durées de chaque étape")
+    parser.add_argument("--max-points", type=int, default=20000, help="Nombre maximal de documents dans topics_embeddings.html")
+    parser.add_argument("--hover-chars", type=int, default=150, help="Longueur maximale du texte affiché au survol")
+    parser.add_argument("--max-html-mb", type=float, default=10.0, help="Budget de taille de chaque fichier HTML, en Mo")
+    parser.add_argument("--offline-html", action="store_true", help="Inclure plotly.js dans chaque fichier HTML (sinon CDN)")
+    parser.add_argument("--figure-workers", type=int, default=4, help="Figures générées en parallèle")
+    parser.add_argument("--reduction-cache", type=Path, default=Path("embedding_cache") / "reduced_2d.npy",
+                        help="Fichier de cache de la réduction 2D des embeddings")
     args = parser.parse_args()
 
-    if args.format == "json" :
-        docs = Corpus.load_json(args.file)
-    if args.format == "xml" :
-        docs = Corpus.load_xml(args.file)
-    if args.format == "pickle":
-        docs = Corpus.load_pickle(args.file)
+    from embedding_cache import EmbeddingStore
 
-    docs = [article for article in docs.articles if article.description != None]
+    timings = {}
 
-    classes = [article.categories for article in docs if article.description != None]
-    
-    docs = [article.description for article in docs if article.description != None]
+    # Lecture en flux : on ne garde que les descriptions, les catégories, les sources et les identifiants
+    docs = []
+    classes = []
+    ids = []
+    strata = []
+    with etape(timings, "lecture"):
+        for article in name_to_iterator[args.format](args.file):
+            if article.description != None:
+                docs.append(article.description)
+                classes.append(article.categories)
+                ids.append(article.id or EmbeddingStore.text_hash(article.description))
+                if args.stratify == "source":
+                    strata.append(article.source)
+                else:
+                    strata.append(article.categories[0] if article.categories else None)
 
     classes_flat = [categorie for categories in classes for categorie in categories]
 
    
     #nlp = spacy.load("fr_core_news_md", exclude=['tagger', 'parser', 'ner','attribute_ruler', 'lemmatizer'])
 
-    topic_model = BERTopic(
-        language='multilingual',
-        embedding_model=embedding_model,
-        vectorizer_model=vectorizer_model,
-        umap_model=umap_model,
-        hdbscan_model=hdbscan_model,
-        ctfidf_model=ctfidf_model,
-        representation_model=representation_model
-        )
-    
+    embedding_model = get_embedding_model()
+
+    with etape(timings, "embeddings"):
+        if args.no_embedding_cache:
+            embeddings = embedding_model.encode(docs, batch_size=args.batch_size, show_progress_bar=True)
+        else:
+            store = EmbeddingStore(args.embedding_cache, EMBEDDING_MODEL_NAME)
+            embeddings = store.embed(ids, docs, lambda batch: embedding_model.encode(batch, batch_size=args.batch_size),
+                                     batch_size=args.batch_size)
+            print(f"Cache des embeddings : {store.stats()}")
 
-    embeddings = embedding_model.encode(docs, show_progress_bar=True)
-    topics, probs = topic_model.fit_transform(docs, embeddings)
-    topic_model.update_topics(docs, vectorizer_model=vectorizer_model)
+    if args.online:
+        run_online(args.online, docs, embeddings, args.label, batch_size=args.online_batch_size,
+                   n_topics=args.online_topics, decay=args.decay)
+        return
+
+    topic_model, vectorizer_model = build_topic_model()
+    sample = None
+    if args.sample and args.sample < len(docs):
+        sample = stratified_sample(strata, args.sample)
+        print(f"Échantillon stratifié par {args.stratify} : {len(sample)} documents sur {len(docs)}")
+        topics = fit_on_sample(topic_model, docs, embeddings, sample, args.transform_batch_size, timings)
+        with etape(timings, "update_topics"):
+            # Représentations et effectifs des thèmes recalculés sur tout le corpus
+            topic_model.update_topics(docs, topics=topics, vectorizer_model=vectorizer_model)
+    else:
+        with etape(timings, "fit_transform"):
+            topics, probs = topic_model.fit_transform(docs, embeddings)
+        with etape(timings, "update_topics"):
+            topic_model.update_topics(docs, vectorizer_model=vectorizer_model)
 
     print(topic_model.get_topic_info())
     #print(topic_model.get_topic(0))
     print(topic_model.get_document_info(docs))
 
-    topics_per_class = topic_model.topics_per_class(docs, classes=classes_flat)
-    topic_model.visualize_topics_per_class(topics_per_class, top_n_topics=10)
-
-    hierarchical_topics = topic_model.hierarchical_topics(docs)
-    fig = topic_model.visualize_hierarchy(hierarchical_topics=hierarchical_topics)
-    fig.write_html("hierarchical_topics.html")
-
-    fig = topic_model.visualize_topics_per_class(topics_per_class)
-    fig.write_html("topics_per_class.html")
-
-    fig = topic_model.visualize_topics()
-    fig.write_html("topics.html")
+    with etape(timings, "réduction 2D"):
+        # Identifiants et empreintes des textes : un titre ou une description modifiés invalident la projection
+        key = hashlib.sha256("\n".join([EMBEDDING_MODEL_NAME, *ids, *map(EmbeddingStore.text_hash, docs)])
+                             .encode("utf-8")).hexdigest()
+        reduced = reduce_2d(embeddings, key, args.reduction_cache, sample=sample, batch_size=args.transform_batch_size)
 
-    #Affiche dans une map de chaleur
-    fig = topic_model.visualize_heatmap()
-    fig.write_html("topics_heatmap.html")
+    with etape(timings, "visualisations"):
+        sizes = export_visualizations(topic_model, docs, classes_flat, reduced, args)
+    print("Taille des fichiers (Mo) :", sizes)
 
-    #Affiche les embeddings
-    fig = topic_model.visualize_documents(docs, embeddings=embeddings)
-    fig.write_html("topics_embeddings.html")
+    print("Durées par étape (s) :", {nom: round(duree, 1) for nom, duree in timings.items()})
+    if args.timings:
+        with open(args.timings, "w", encoding="utf-8") as f:
+            json.dump({"documents": len(docs), "sample": args.sample, "timings": timings}, f, ensure_ascii=False, indent=4)
 
 
 if __name__ == "__main__" :
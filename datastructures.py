@@ -1,12 +1,155 @@
-from dataclasses import dataclass, field
-from typing import List, Dict, Any, Optional
+from dataclasses import dataclass, field, fields, MISSING
+from typing import List, Dict, Any, Optional, Iterator, Iterable, TextIO, BinaryIO
 from pathlib import Path
+from array import array
 import xml.etree.ElementTree as ET
 import pickle
 import json
 import argparse
+import os
+import re
+import sys
+import mmap
+import struct
+import hashlib
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
 
-@dataclass
+
+class Vocabulary:
+    """Table d'internement : associe chaque chaîne à un identifiant entier (0 est réservé à None)"""
+    __slots__ = ("strings", "ids")
+
+    def __init__(self):
+        self.strings: List[Optional[str]] = [None]
+        self.ids: Dict[Optional[str], int] = {None: 0}
+
+    def intern(self, string: Optional[str]) -> int:
+        """Retourne l'identifiant de la chaîne, en l'ajoutant si elle est nouvelle"""
+        string_id = self.ids.get(string)
+        if string_id is None:
+            string = sys.intern(string)
+            string_id = len(self.strings)
+            self.strings.append(string)
+            self.ids[string] = string_id
+        return string_id
+
+    def __getitem__(self, string_id: int) -> Optional[str]:
+        return self.strings[string_id]
+
+    def __len__(self) -> int:
+        return len(self.strings)
+
+
+# Vocabulaire partagé par tous les tokens (formes, lemmes et POS)
+TOKEN_VOCABULARY = Vocabulary()
+
+
+def _intern(value):
+    """Interne une chaîne (source, catégorie) pour ne garder qu'une copie en mémoire"""
+    return sys.intern(value) if type(value) is str else value
+
+
+@lru_cache(maxsize=None)
+def _field_defaults(cls) -> tuple:
+    """(nom, valeur par défaut, fabrique) des champs d'une dataclass, calculés une fois par classe"""
+    return tuple((f.name, f.default, None if f.default_factory is MISSING else f.default_factory)
+                 for f in fields(cls))
+
+
+def _restore_fields(obj, state) -> None:
+    """Restaure les champs d'une dataclass à slots depuis un état pickle (tuple, ou dict des anciennes versions)"""
+    if isinstance(state, tuple) and len(state) == 2 and (state[0] is None or isinstance(state[0], dict)) \
+            and isinstance(state[1], dict):
+        state = state[1]  # Etat par défaut (None, slots) de pickle
+    defaults = _field_defaults(type(obj))
+    if not isinstance(state, dict):
+        # Tuple d'une version antérieure : les champs ajoutés depuis sont en fin de liste
+        for (name, default, factory), value in zip(defaults, state):
+            setattr(obj, name, value)
+        for name, default, factory in defaults[len(state):]:
+            setattr(obj, name, default if factory is None else factory())
+        return
+    for name, default, factory in defaults:
+        if name in state:
+            value = state[name]
+        elif factory is None:
+            value = default
+        else:
+            value = factory()
+        setattr(obj, name, value)
+
+
+# Formats de date rencontrés dans les flux, en plus du RFC-822 et de l'ISO 8601
+_DATE_FORMATS = ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%d/%m/%Y %H:%M:%S", "%d/%m/%Y %H:%M", "%d/%m/%Y")
+
+
+# Forme RFC-822 la plus courante ("Sat, 15 Feb 2025 21:11:55 +0100"), traitée sans passer par email.utils
+_RFC822_NUMERIC = re.compile(
+    r'(?:[A-Za-z]{3},\s*)?(\d{1,2})\s+([A-Za-z]{3})\s+(\d{4})\s+(\d{2}):(\d{2})(?::(\d{2}))?\s+([+-])(\d{2})(\d{2})$'
+)
+_MONTHS = {month: number for number, month in enumerate(
+    ("jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"), start=1)}
+
+
+def parse_date(text: Optional[str]) -> Optional[int]:
+    """Convertit une date de flux RSS en timestamp (secondes), None si la date est illisible.
+
+    Le timestamp est celui de l'heure locale de publication, fuseau ignoré : "Sat, 15 Feb 2025
+    00:12:26 +0100" tombe le 15 février, comme une borne de filtrage "2025-02-15" sans fuseau.
+    Accepte les variantes RFC-822 (avec ou sans jour de la semaine, fuseau numérique ou nommé),
+    l'ISO 8601 et quelques formats numériques courants.
+    """
+    if not text or not text.strip():
+        return None
+    text = text.strip()
+    match = _RFC822_NUMERIC.match(text)
+    if match:
+        day, month, year, hour, minute, second = match.groups()[:6]
+        month = _MONTHS.get(month.lower())
+        if month is not None:
+            try:
+                date = datetime(int(year), month, int(day), int(hour), int(minute), int(second or 0),
+                                tzinfo=timezone.utc)
+            except ValueError:
+                return None
+            return int(date.timestamp())
+    try:
+        date = parsedate_to_datetime(text)
+    except (TypeError, ValueError, IndexError, OverflowError):
+        date = None
+    if date is None:
+        try:
+            date = datetime.fromisoformat(text[:-1] + "+00:00" if text.endswith("Z") else text)
+        except ValueError:
+            for date_format in _DATE_FORMATS:
+                try:
+                    date = datetime.strptime(text, date_format)
+                    break
+                except ValueError:
+                    continue
+    if date is None:
+        return None
+    return int(date.replace(tzinfo=timezone.utc).timestamp())
+
+
+@lru_cache(maxsize=None)
+def borne_date(date: Optional[str]) -> Optional[int]:
+    """Convertit une borne de filtrage (format YYYY-MM-DD) en timestamp, une seule fois par borne.
+
+    Lève ValueError si la date est illisible : un filtre invalide ne doit pas être ignoré.
+    """
+    if not date:
+        return None
+    timestamp = parse_date(date)
+    if timestamp is None:
+        raise ValueError(f"Date de filtrage invalide : {date}")
+    return timestamp
+
+
+@dataclass(slots=True)
 class Token:
     """Common interface for tokens from different analyzers"""
     text: str
@@ -30,8 +173,105 @@ class Token:
             pos=data.get('pos')
         )
 
+    def __getstate__(self):
+        return (self.text, self.lemma, self.pos)
 
-@dataclass
+    def __setstate__(self, state):
+        _restore_fields(self, state)
+
+
+class TokenList:
+    """Liste compacte de tokens : trois tableaux d'identifiants (forme, lemme, POS) dans TOKEN_VOCABULARY.
+
+    Les objets Token ne sont créés qu'à l'accès, l'interface reste celle d'une liste de Token.
+    """
+    __slots__ = ("_text", "_lemma", "_pos")
+
+    def __init__(self, tokens: Iterable[Token] = ()):
+        self._text = array('I')
+        self._lemma = array('I')
+        self._pos = array('I')
+        self.extend(tokens)
+
+    @classmethod
+    def from_dicts(cls, tokens_data: Iterable[Dict[str, Any]]) -> 'TokenList':
+        """Construit la liste directement depuis des dictionnaires, sans objets Token intermédiaires"""
+        tokens = cls()
+        intern = TOKEN_VOCABULARY.intern
+        for token_data in tokens_data:
+            tokens._text.append(intern(token_data.get('text', '')))
+            tokens._lemma.append(intern(token_data.get('lemma')))
+            tokens._pos.append(intern(token_data.get('pos')))
+        return tokens
+
+    def append(self, token: Token) -> None:
+        intern = TOKEN_VOCABULARY.intern
+        self._text.append(intern(token.text))
+        self._lemma.append(intern(token.lemma))
+        self._pos.append(intern(token.pos))
+
+    def extend(self, tokens: Iterable[Token]) -> None:
+        if isinstance(tokens, TokenList):
+            self._text.extend(tokens._text)
+            self._lemma.extend(tokens._lemma)
+            self._pos.extend(tokens._pos)
+            return
+        for token in tokens:
+            self.append(token)
+
+    def __len__(self) -> int:
+        return len(self._text)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            tokens = TokenList()
+            tokens._text = self._text[index]
+            tokens._lemma = self._lemma[index]
+            tokens._pos = self._pos[index]
+            return tokens
+        strings = TOKEN_VOCABULARY.strings
+        return Token(strings[self._text[index]], strings[self._lemma[index]], strings[self._pos[index]])
+
+    def __iter__(self) -> Iterator[Token]:
+        strings = TOKEN_VOCABULARY.strings
+        for text, lemma, pos in zip(self._text, self._lemma, self._pos):
+            yield Token(strings[text], strings[lemma], strings[pos])
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, TokenList):
+            return self._text == other._text and self._lemma == other._lemma and self._pos == other._pos
+        if isinstance(other, list):
+            return list(self) == other
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"TokenList({list(self)!r})"
+
+    def __reduce__(self):
+        if not self._text:
+            return (TokenList, ())
+        # Les identifiants ne valent que dans ce processus : on sérialise un vocabulaire local.
+        # Les chaînes étant internées, pickle ne les écrit qu'une fois pour tout le corpus.
+        local_ids: Dict[int, int] = {}
+        columns = []
+        for column in (self._text, self._lemma, self._pos):
+            columns.append(array('I', [local_ids.setdefault(i, len(local_ids)) for i in column]))
+        strings = TOKEN_VOCABULARY.strings
+        vocabulary = tuple(strings[i] for i in local_ids)
+        return (_token_list_from_state, (vocabulary, *columns))
+
+
+def _token_list_from_state(vocabulary, text, lemma, pos) -> TokenList:
+    """Reconstruit une TokenList picklée en réinternant son vocabulaire local"""
+    remap = [TOKEN_VOCABULARY.intern(string) for string in vocabulary]
+    tokens = TokenList()
+    tokens._text = array('I', [remap[i] for i in text])
+    tokens._lemma = array('I', [remap[i] for i in lemma])
+    tokens._pos = array('I', [remap[i] for i in pos])
+    return tokens
+
+
+@dataclass(slots=True)
 class Article:
     id: str
     source: str
@@ -39,14 +279,46 @@ class Article:
     description: str
     date: str
     categories: List[str] = field(default_factory=list)
-    tokens: list[list[Token]] = field(default_factory=list)
+    tokens: TokenList = field(default_factory=TokenList)
+    # Date normalisée à l'ingestion (heure locale de publication, voir parse_date), calculée depuis date si elle n'est pas fournie
+    timestamp: Optional[int] = None
+
+    def __post_init__(self):
+        if self.timestamp is None:
+            self.timestamp = parse_date(self.date)
+
+    def __setattr__(self, name, value):
+        # Représentation compacte : source et catégories internées, tokens en TokenList
+        if name == "tokens":
+            if not isinstance(value, TokenList):
+                value = TokenList(value or ())
+        elif name == "source":
+            value = _intern(value)
+        elif name == "categories" and isinstance(value, list):
+            value = [_intern(category) for category in value]
+        object.__setattr__(self, name, value)
+
+    def __getstate__(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __setstate__(self, state):
+        if isinstance(state, tuple) and len(state) == len(self.__slots__):
+            # Etat produit par __getstate__ : déjà compact, pickle a partagé les chaînes identiques
+            for name, value in zip(self.__slots__, state):
+                object.__setattr__(self, name, value)
+        else:
+            _restore_fields(self, state)
+            # Anciens pickles sans timestamp
+            if self.timestamp is None:
+                self.timestamp = parse_date(self.date)
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'Article':
         """Crée un Article à partir d'un dictionnaire"""
-        tokens = []
+        tokens = TokenList()
         if 'tokens' in data and isinstance(data['tokens'], list):
-            tokens = [Token.from_dict(token_data) for token_data in data['tokens']]
+            tokens = TokenList.from_dicts(data['tokens'])
+        timestamp = data.get('timestamp')
 
         return cls(
             id=data.get('id', ''),
@@ -55,7 +327,8 @@ class Article:
             description=data.get('description', ''),
             date=data.get('date', ''),
             categories=data.get('categories', []),
-            tokens=tokens
+            tokens=tokens,
+            timestamp=int(timestamp) if timestamp not in (None, '') else None
         )
     
     def to_dict(self) -> Dict[str, Any]:
@@ -67,92 +340,374 @@ class Article:
             'description': self.description,
             'date': self.date,
             'categories': self.categories,
-            'tokens': [token.to_dict() for token in self.tokens] if self.tokens else []
+            'tokens': [token.to_dict() for token in self.tokens] if self.tokens else [],
+            'timestamp': self.timestamp
+        }
+
+def _skip_json_separators(buffer: str, pos: int) -> int:
+    """Avance la position après les blancs et les virgules séparant les éléments d'un tableau JSON"""
+    while pos < len(buffer) and buffer[pos] in ' \t\n\r,':
+        pos += 1
+    return pos
+
+
+def _article_data_from_element(article_elem: ET.Element) -> Dict[str, Any]:
+    """Convertit un élément <article> en dictionnaire compatible avec Article.from_dict"""
+    article_data = {}
+
+    for child in article_elem:
+        if child.tag == "tokens" and len(child) > 0:
+            article_data["tokens"] = []
+            for token_elem in child.findall("item"):
+                token_data = {}
+                for token_attr in token_elem:
+                    token_data[token_attr.tag] = token_attr.text
+                article_data["tokens"].append(token_data)
+        elif len(child) > 0:  # Si c'est une liste (ex. categories)
+            article_data[child.tag] = [item.text for item in child.findall("item")]
+        else:
+            article_data[child.tag] = child.text
+
+    return article_data
+
+
+def _article_to_element(article: Article) -> ET.Element:
+    """Construit l'élément <article> d'un seul Article"""
+    article_elem = ET.Element("article")
+
+    for key, value in article.to_dict().items():
+        if key == "tokens" and value:
+            # Traitement spécial pour les tokens
+            tokens_elem = ET.SubElement(article_elem, "tokens")
+            for token in value:
+                token_elem = ET.SubElement(tokens_elem, "item")
+                for token_key, token_value in token.items():
+                    if token_value is not None:  # Ne pas ajouter les attributs None
+                        token_attr = ET.SubElement(token_elem, token_key)
+                        token_attr.text = str(token_value)
+        elif isinstance(value, list):  # Si c'est une liste (catégories)
+            list_elem = ET.SubElement(article_elem, key)
+            for item in value:
+                item_elem = ET.SubElement(list_elem, "item")
+                item_elem.text = str(item)
+        else:
+            sub_elem = ET.SubElement(article_elem, key)
+            sub_elem.text = str(value) if value is not None else ""
+
+    return article_elem
+
+
+def article_categories(article: Article) -> List[str]:
+    """Catégories d'un article ; une seule chaîne "a, b" (lecteur regex) est découpée"""
+    if not isinstance(article.categories, list):
+        return []
+    if len(article.categories) == 1 and article.categories[0]:
+        return article.categories[0].split(", ")
+    return [category for category in article.categories if category]
+
+
+def source_matches(source: Optional[str], sources: Optional[List[str]]) -> bool:
+    """Vrai si la source contient l'une des sources demandées (sans tenir compte de la casse)"""
+    if not sources:
+        return True
+    source = (source or "").lower()
+    return any(s.lower() in source for s in sources)
+
+
+def article_matches(article: Article, start: Optional[int] = None, end: Optional[int] = None,
+                    sources: Optional[List[str]] = None, categories: Optional[List[str]] = None) -> bool:
+    """Mêmes critères que CorpusIndex.query, évalués sur un seul article (filtrage en flux)"""
+    if start is not None or end is not None:
+        if article.timestamp is None:
+            return False
+        if (start is not None and article.timestamp < start) or (end is not None and article.timestamp > end):
+            return False
+    if not source_matches(article.source, sources):
+        return False
+    return not categories or any(category in categories for category in article_categories(article))
+
+
+class CorpusIndex:
+    """Index inversés d'un corpus : source et catégorie -> rangs des articles, et dates triées -> rangs.
+
+    Les listes de rangs sont des array('I') triés, converties en ensembles au moment des requêtes ;
+    un filtre combine les critères par intersection au lieu de tester chaque article.
+    """
+    VERSION = 2
+
+    def __init__(self, size: int = 0):
+        self.size = size
+        self.sources: Dict[str, array] = {}
+        self.categories: Dict[str, array] = {}
+        self.timestamps = array('q')
+        self.ranks = array('I')
+        # Fichier corpus indexé (taille, date de modification) pour détecter un index périmé
+        self.corpus_stat: Optional[tuple] = None
+
+    @classmethod
+    def build(cls, articles: Iterable[Article]) -> 'CorpusIndex':
+        """Construit l'index en un seul passage sur un flux d'articles"""
+        index = cls()
+        dated = []
+        for rank, article in enumerate(articles):
+            source = (article.source or "").lower()
+            index.sources.setdefault(source, array('I')).append(rank)
+            for category in set(article_categories(article)):
+                index.categories.setdefault(category, array('I')).append(rank)
+            if article.timestamp is not None:
+                dated.append((article.timestamp, rank))
+            index.size = rank + 1
+        dated.sort()
+        index.timestamps = array('q', [timestamp for timestamp, _ in dated])
+        index.ranks = array('I', [rank for _, rank in dated])
+        return index
+
+    def ranks_between(self, start: Optional[int] = None, end: Optional[int] = None) -> array:
+        """Rangs des articles datés entre start et end inclus (ordre chronologique), par recherche dichotomique"""
+        low = 0 if start is None else bisect_left(self.timestamps, start)
+        high = len(self.timestamps) if end is None else bisect_right(self.timestamps, end)
+        return self.ranks[low:high]
+
+    def query(self, start: Optional[int] = None, end: Optional[int] = None,
+              sources: Optional[List[str]] = None, categories: Optional[List[str]] = None) -> List[int]:
+        """Rangs, dans l'ordre du corpus, des articles satisfaisant tous les critères donnés.
+
+        Une source correspond à toute source qui la contient (sans tenir compte de la casse),
+        une catégorie doit être présente telle quelle parmi celles de l'article.
+        """
+        candidates = []
+        if start is not None or end is not None:
+            candidates.append(set(self.ranks_between(start, end)))
+        if sources:
+            matched = set()
+            for source, ranks in self.sources.items():
+                if source_matches(source, sources):
+                    matched.update(ranks)
+            candidates.append(matched)
+        if categories:
+            matched = set()
+            for category in categories:
+                matched.update(self.categories.get(category, ()))
+            candidates.append(matched)
+
+        if not candidates:
+            return list(range(self.size))
+        candidates.sort(key=len)
+        result = candidates[0].intersection(*candidates[1:])
+        return sorted(result)
+
+    def save(self, output_file: Path) -> None:
+        """Sauvegarde l'index (à côté du corpus, par exemple corpus.json.index)"""
+        state = {
+            "version": self.VERSION,
+            "size": self.size,
+            "corpus_stat": self.corpus_stat,
+            "sources": self.sources,
+            "categories": self.categories,
+            "timestamps": self.timestamps,
+            "ranks": self.ranks,
         }
+        with open(output_file, 'wb') as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, input_file: Path) -> Optional['CorpusIndex']:
+        """Charge un index sauvegardé, None s'il est absent ou d'une autre version"""
+        try:
+            with open(input_file, 'rb') as f:
+                state = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+        if not isinstance(state, dict) or state.get("version") != cls.VERSION:
+            return None
+        index = cls(state["size"])
+        index.corpus_stat = state["corpus_stat"]
+        index.sources = state["sources"]
+        index.categories = state["categories"]
+        index.timestamps = state["timestamps"]
+        index.ranks = state["ranks"]
+        return index
+
+    @classmethod
+    def for_file(cls, corpus_file: Path, loader: str) -> 'CorpusIndex':
+        """Index persistant d'un fichier corpus : rechargé s'il est à jour, sinon reconstruit et sauvegardé"""
+        stat = os.stat(corpus_file)
+        corpus_stat = (stat.st_size, stat.st_mtime_ns)
+        index_file = f"{corpus_file}.index"
+        index = cls.load(index_file)
+        if index is not None and index.corpus_stat == corpus_stat:
+            return index
+        index = cls.build(name_to_iterator[loader](corpus_file))
+        index.corpus_stat = corpus_stat
+        index.save(index_file)
+        return index
+
 
 @dataclass
 class Corpus:
     articles: list[Article] = field(default_factory=list)
+    # Index inversés du corpus, construits à la première requête
+    _index: Optional[CorpusIndex] = field(default=None, init=False, repr=False, compare=False)
+
+    def __setattr__(self, name, value):
+        # Une nouvelle liste d'articles rend l'index périmé
+        if name == "articles":
+            object.__setattr__(self, "_index", None)
+        object.__setattr__(self, name, value)
+
+    def invalidate_indexes(self) -> None:
+        """À appeler après toute modification en place de articles (ajout, suppression, remplacement, édition)"""
+        self._index = None
+
+    def index(self) -> CorpusIndex:
+        """Index inversés (source, catégorie, date) du corpus, construits une seule fois"""
+        if self._index is None:
+            self._index = CorpusIndex.build(self.articles)
+        return self._index
+
+    def query(self, start: Optional[int] = None, end: Optional[int] = None,
+              sources: Optional[List[str]] = None, categories: Optional[List[str]] = None) -> list[Article]:
+        """Articles satisfaisant tous les critères, par intersection des index inversés"""
+        return [self.articles[rank] for rank in self.index().query(start, end, sources, categories)]
+
+    @classmethod
+    def iter_json(cls, input_file: Path, chunk_size: int = 1 << 16) -> Iterator[Article]:
+        """Lit un tableau JSON d'articles de façon incrémentale et produit les Article un par un"""
+        decoder = json.JSONDecoder()
+        with open(input_file, 'r', encoding='utf-8') as f:
+            buffer = f.read(chunk_size)
+            eof = not buffer
+            pos = _skip_json_separators(buffer, 0)
+            # Le fichier doit contenir un tableau JSON
+            while pos >= len(buffer) and not eof:
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buffer, pos = buffer[pos:] + chunk, 0
+                pos = _skip_json_separators(buffer, pos)
+            if pos >= len(buffer):
+                return
+            if buffer[pos] != '[':
+                raise ValueError("Le fichier JSON doit contenir une liste d'articles")
+            pos += 1
+
+            # Taille de lecture doublée à chaque article incomplet : un article plus grand que le tampon
+            # est décodé en O(taille) et non en O(taille² / chunk_size)
+            read_size = chunk_size
+            while True:
+                pos = _skip_json_separators(buffer, pos)
+                if pos < len(buffer) and buffer[pos] == ']':
+                    return
+                try:
+                    if pos >= len(buffer):
+                        raise json.JSONDecodeError("Fin du tampon", buffer, pos)
+                    data, end = decoder.raw_decode(buffer, pos)
+                    # Une valeur qui touche la fin du tampon peut être tronquée
+                    if end >= len(buffer) and not eof:
+                        raise json.JSONDecodeError("Fin du tampon", buffer, end)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                    # On ne garde en mémoire que la partie non lue du tampon
+                    chunk = f.read(read_size)
+                    eof = not chunk
+                    buffer, pos = buffer[pos:] + chunk, 0
+                    read_size = max(chunk_size, 2 * len(buffer))
+                    continue
+
+                yield Article.from_dict(data)
+                pos = end
+                read_size = chunk_size
 
     @classmethod
     def load_json(cls, input_file: Path):
         """Charge un corpus depuis un fichier JSON"""
         try:
-            with open(input_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-
-            articles = [Article.from_dict(article_data) for article_data in data]
-            return cls(articles)
+            return cls(list(cls.iter_json(input_file)))
         except Exception as e:
             print(f"Erreur lors du chargement du fichier JSON: {e}")
             return cls([])
 
-    def save_json(self, output_file: Path) -> None:
+    @staticmethod
+    def dump_json(articles: Iterable[Article], f: TextIO, compact: bool = False) -> int:
+        """Écrit les articles un par un dans un fichier JSON ouvert, retourne le nombre d'articles écrits"""
+        # Mode compact : un article par ligne, sans indentation
+        prefix = "\n" if compact else "\n    "
+        count = 0
+        f.write("[")
+        for article in articles:
+            if compact:
+                text = json.dumps(article.to_dict(), ensure_ascii=False, separators=(",", ":"))
+            else:
+                # Même rendu que json.dump(..., indent=4) sur la liste complète
+                text = json.dumps(article.to_dict(), ensure_ascii=False, indent=4)
+                text = text.replace("\n", "\n    ")
+            f.write(("," if count else "") + prefix + text)
+            count += 1
+        f.write("\n]" if count else "]")
+        return count
+
+    @classmethod
+    def write_json(cls, articles: Iterable[Article], output_file: Path, compact: bool = False) -> int:
+        """Sauvegarde un flux d'articles dans un fichier JSON sans matérialiser le corpus.
+
+        Une erreur d'écriture est propagée : l'appelant ne doit pas croire la sortie à jour.
+        """
+        with open(output_file, 'w', encoding='utf-8') as f:
+            count = cls.dump_json(articles, f, compact=compact)
+        print(f"Corpus sauvegardé dans {output_file}")
+        return count
+
+    def save_json(self, output_file: Path, compact: bool = False) -> None:
         """Sauvegarde le corpus dans un fichier JSON"""
         try:
-            articles_dict = [article.to_dict() for article in self.articles]
-            with open(output_file, 'w', encoding='utf-8') as f:
-                json.dump(articles_dict, f, ensure_ascii=False, indent=4)
-            print(f"Corpus sauvegardé dans {output_file}")
+            self.write_json(self.articles, output_file, compact=compact)
         except Exception as e:
             print(f"Erreur lors de la sauvegarde en JSON: {e}")
 
+    @classmethod
+    def iter_xml(cls, input_file: Path) -> Iterator[Article]:
+        """Lit un corpus XML avec iterparse et produit les Article un par un"""
+        context = ET.iterparse(input_file, events=("start", "end"))
+        root = None
+        depth = 0
+        for event, elem in context:
+            if event == "start":
+                if root is None:
+                    root = elem
+                depth += 1
+                continue
+            depth -= 1
+            # Seuls les <article> directement sous la racine sont des articles
+            if elem.tag == "article" and depth == 1:
+                yield Article.from_dict(_article_data_from_element(elem))
+                # Libérer les éléments déjà traités
+                root.clear()
+
     @classmethod
     def load_xml(cls, input_file: Path):
-        tree = ET.parse(input_file)
-        root = tree.getroot()
-
-        articles = []
-        for article_elem in root.findall("article"):
-            article_data = {}
-
-            for child in article_elem:
-                if child.tag == "tokens" and len(child) > 0:
-                    article_data["tokens"] = []
-                    for token_elem in child.findall("item"):
-                        token_data = {}
-                        for token_attr in token_elem:
-                            token_data[token_attr.tag] = token_attr.text
-                        article_data["tokens"].append(token_data)
-                elif len(child) > 0:  # Si c'est une liste (ex. categories)
-                    article_data[child.tag] = [item.text for item in child.findall("item")]
-                else:
-                    article_data[child.tag] = child.text
+        return cls(list(cls.iter_xml(input_file)))
 
-            articles.append(Article.from_dict(article_data))
+    @staticmethod
+    def dump_xml(articles: Iterable[Article], f: BinaryIO) -> int:
+        """Écrit les articles un par un dans un fichier XML ouvert en binaire, retourne le nombre d'articles écrits"""
+        count = 0
+        f.write(b"<?xml version='1.0' encoding='utf-8'?>\n<articles>")
+        for article in articles:
+            # On ne construit l'arbre que d'un seul article à la fois
+            f.write(ET.tostring(_article_to_element(article), encoding="utf-8"))
+            count += 1
+        f.write(b"</articles>")
+        return count
 
-        return cls(articles)
+    @classmethod
+    def write_xml(cls, articles: Iterable[Article], output_file: Path) -> int:
+        """Sauvegarde un flux d'articles en XML sans construire l'arbre complet"""
+        with open(output_file, 'wb') as f:
+            return cls.dump_xml(articles, f)
 
     def save_xml(self, output_file: Path) -> None:
         """Sauvegarde le Corpus en XML"""
-        root = ET.Element("articles")  # créer le root
-
-        for article in self.articles:
-            article_elem = ET.SubElement(root, "article")
-            article_dict = article.to_dict()
-            
-            for key, value in article_dict.items():
-                if key == "tokens" and value:
-                    # Traitement spécial pour les tokens
-                    tokens_elem = ET.SubElement(article_elem, "tokens")
-                    for token in value:
-                        token_elem = ET.SubElement(tokens_elem, "item")
-                        for token_key, token_value in token.items():
-                            if token_value is not None:  # Ne pas ajouter les attributs None
-                                token_attr = ET.SubElement(token_elem, token_key)
-                                token_attr.text = str(token_value)
-                elif isinstance(value, list):  # Si c'est une liste (catégories)
-                    list_elem = ET.SubElement(article_elem, key)
-                    for item in value:
-                        item_elem = ET.SubElement(list_elem, "item")
-                        item_elem.text = str(item)
-                else:
-                    sub_elem = ET.SubElement(article_elem, key)
-                    sub_elem.text = str(value) if value is not None else ""
-                
-        tree = ET.ElementTree(root)
-        tree.write(output_file, encoding="utf-8", xml_declaration=True)
-
+        self.write_xml(self.articles, output_file)
 
     @classmethod
     def load_pickle(cls, input_file: Path):
@@ -179,34 +734,356 @@ class Corpus:
     def save_pickle(self, output_file: Path) -> None:
         """Sauvegarde le corpus dans un fichier pickle"""
         try:
-            with open(output_file, 'wb') as f:
-                pickle.dump(self, f)
-            print(f"Corpus sauvegardé dans {output_file}")
+            self._dump_pickle(output_file)
         except Exception as e:
             print(f"Erreur lors de la sauvegarde en pickle: {e}")
 
+    def _dump_pickle(self, output_file: Path) -> None:
+        with open(output_file, 'wb') as f:
+            pickle.dump(self, f)
+        print(f"Corpus sauvegardé dans {output_file}")
+
+    @classmethod
+    def iter_pickle(cls, input_file: Path) -> Iterator[Article]:
+        """Le format pickle ne se lit pas en flux : on charge le corpus puis on itère"""
+        yield from cls.load_pickle(input_file).articles
+
+    @classmethod
+    def write_pickle(cls, articles: Iterable[Article], output_file: Path) -> int:
+        """Le format pickle ne s'écrit pas en flux : on matérialise le corpus puis on le sauvegarde"""
+        corpus = cls(list(articles))
+        corpus._dump_pickle(output_file)
+        return len(corpus.articles)
+
+    @classmethod
+    def iter_binary(cls, input_file: Path) -> Iterator[Article]:
+        """Lit un corpus binaire article par article via mmap"""
+        with BinaryCorpus(input_file) as binary_corpus:
+            yield from binary_corpus
+
+    @classmethod
+    def load_binary(cls, input_file: Path):
+        """Charge un corpus depuis un fichier binaire"""
+        return cls(list(cls.iter_binary(input_file)))
+
+    @classmethod
+    def write_binary(cls, articles: Iterable[Article], output_file: Path) -> int:
+        """Sauvegarde un flux d'articles au format binaire, retourne le nombre d'articles écrits"""
+        with open(output_file, 'wb') as f:
+            count = _dump_binary(articles, f)
+        print(f"Corpus sauvegardé dans {output_file}")
+        return count
+
+    def save_binary(self, output_file: Path) -> None:
+        """Sauvegarde le corpus au format binaire"""
+        self.write_binary(self.articles, output_file)
+
+
+# Format binaire : en-tête, enregistrements des articles, puis trois sections
+# (vocabulaire, table des positions, index id -> position), alignées sur 8 octets.
+#   en-tête     : magic, version, nombre d'articles, position des trois sections
+#   article     : id, source, titre, description, date (longueur u32 + utf-8), timestamp i64 (version 2),
+#                 catégories (nombre u32 + ids du vocabulaire),
+#                 tokens (nombre u32 + colonnes u32 forme / lemme / POS)
+#   vocabulaire : nombre u32, positions u32 (nombre + 1) puis les chaînes utf-8
+#   positions   : u64 (nombre + 1) début de chaque enregistrement
+#   index       : hachages u64 des id triés, puis rang u32 de l'article correspondant
+BINARY_MAGIC = b"PPE2CORP"
+BINARY_VERSION = 2
+_BINARY_HEADER = struct.Struct("<8sIIQQQ")
+_NONE_LENGTH = 0xFFFFFFFF  # Chaîne absente (None)
+_STRING_CATEGORIES = 0xFFFFFFFE  # Catégories stockées comme une chaîne (ancien format "[]")
+_NO_TIMESTAMP = -(1 << 63)  # Date illisible
+
+
+def _id_hash(article_id: Optional[str]) -> int:
+    """Hachage stable sur 64 bits d'un identifiant d'article"""
+    digest = hashlib.blake2b((article_id or "").encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+def _pad(f: BinaryIO) -> int:
+    """Aligne la position d'écriture sur 8 octets et la retourne"""
+    position = f.tell()
+    padding = -position % 8
+    if padding:
+        f.write(b"\0" * padding)
+    return position + padding
+
+
+def _little_endian(column: array) -> array:
+    if sys.byteorder != "little":
+        column = array(column.typecode, column)
+        column.byteswap()
+    return column
+
+
+def _dump_binary(articles: Iterable[Article], f: BinaryIO) -> int:
+    """Écrit les articles un par un au format binaire dans un fichier ouvert"""
+    vocabulary = Vocabulary()
+    offsets = array('Q')
+    hashes = []
+    pack_u32 = struct.Struct("<I").pack
+    pack_i64 = struct.Struct("<q").pack
+
+    def write_string(value):
+        if value is None:
+            f.write(pack_u32(_NONE_LENGTH))
+            return
+        data = str(value).encode("utf-8")
+        f.write(pack_u32(len(data)))
+        f.write(data)
+
+    f.write(b"\0" * _BINARY_HEADER.size)
+    for article in articles:
+        offsets.append(f.tell())
+        hashes.append((_id_hash(article.id), len(hashes)))
+        for value in (article.id, article.source, article.title, article.description, article.date):
+            write_string(value)
+        f.write(pack_i64(_NO_TIMESTAMP if article.timestamp is None else article.timestamp))
+
+        categories = article.categories
+        if isinstance(categories, list):
+            f.write(pack_u32(len(categories)))
+            f.write(_little_endian(array('I', [vocabulary.intern(c) for c in categories])).tobytes())
+        elif categories is None:
+            f.write(pack_u32(_NONE_LENGTH))
+        else:
+            f.write(pack_u32(_STRING_CATEGORIES))
+            write_string(categories)
+
+        tokens = article.tokens
+        f.write(pack_u32(len(tokens)))
+        strings = TOKEN_VOCABULARY.strings
+        for column in (tokens._text, tokens._lemma, tokens._pos):
+            local = array('I', [vocabulary.intern(strings[i]) for i in column])
+            f.write(_little_endian(local).tobytes())
+    offsets.append(f.tell())
+
+    # Vocabulaire : positions relatives puis chaînes concaténées
+    vocabulary_offset = _pad(f)
+    encoded = [(string or "").encode("utf-8") for string in vocabulary.strings]
+    positions = array('I', [0])
+    for data in encoded:
+        positions.append(positions[-1] + len(data))
+    f.write(pack_u32(len(encoded)))
+    f.write(_little_endian(positions).tobytes())
+    for data in encoded:
+        f.write(data)
+
+    offsets_offset = _pad(f)
+    f.write(_little_endian(offsets).tobytes())
+
+    index_offset = _pad(f)
+    hashes.sort()
+    f.write(_little_endian(array('Q', [h for h, _ in hashes])).tobytes())
+    f.write(_little_endian(array('I', [rank for _, rank in hashes])).tobytes())
+
+    f.seek(0)
+    f.write(_BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, len(hashes),
+                                vocabulary_offset, offsets_offset, index_offset))
+    return len(hashes)
+
+
+class BinaryCorpus:
+    """Corpus binaire ouvert avec mmap : accès aléatoire aux articles sans tout charger.
+
+    Les articles ne sont décodés qu'à l'accès, par rang (corpus[i], corpus[i:j]) ou par id (corpus.get(id)).
+    """
+
+    def __init__(self, input_file: Path):
+        self._file = open(input_file, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._buffer = memoryview(self._mmap)
+        magic, self._version, self._count, vocabulary_offset, offsets_offset, index_offset = \
+            _BINARY_HEADER.unpack_from(self._buffer, 0)
+        if magic != BINARY_MAGIC or not 1 <= self._version <= BINARY_VERSION:
+            self.close()
+            raise ValueError(f"{input_file} n'est pas un corpus binaire (version {BINARY_VERSION})")
+
+        (vocabulary_size,) = struct.unpack_from("<I", self._buffer, vocabulary_offset)
+        self._vocabulary_positions = self._column('I', vocabulary_offset + 4, vocabulary_size + 1)
+        self._vocabulary_start = vocabulary_offset + 4 + 4 * (vocabulary_size + 1)
+        # Identifiant du vocabulaire du fichier -> identifiant dans TOKEN_VOCABULARY (résolu à la demande)
+        self._vocabulary_cache: Dict[int, Optional[str]] = {0: None}
+        self._token_ids = array('I', [0]) * vocabulary_size
+        self._offsets = self._column('Q', offsets_offset, self._count + 1)
+        self._hashes = self._column('Q', index_offset, self._count)
+        self._ranks = self._column('I', index_offset + 8 * self._count, self._count)
+
+    def _column(self, typecode: str, offset: int, count: int):
+        """Vue sans copie d'une colonne d'entiers du fichier"""
+        size = array(typecode).itemsize
+        view = self._buffer[offset:offset + size * count]
+        if sys.byteorder == "little":
+            return view.cast(typecode)
+        column = array(typecode, view.tobytes())
+        column.byteswap()
+        return column
+
+    def _string(self, vocabulary_id: int) -> Optional[str]:
+        if vocabulary_id not in self._vocabulary_cache:
+            start = self._vocabulary_start + self._vocabulary_positions[vocabulary_id]
+            end = self._vocabulary_start + self._vocabulary_positions[vocabulary_id + 1]
+            self._vocabulary_cache[vocabulary_id] = sys.intern(str(self._buffer[start:end], "utf-8"))
+        return self._vocabulary_cache[vocabulary_id]
+
+    def _token_id(self, vocabulary_id: int) -> int:
+        token_id = self._token_ids[vocabulary_id]
+        if not token_id and vocabulary_id:
+            token_id = TOKEN_VOCABULARY.intern(self._string(vocabulary_id))
+            self._token_ids[vocabulary_id] = token_id
+        return token_id
+
+    def _read_article(self, rank: int) -> Article:
+        buffer = self._buffer
+        position = self._offsets[rank]
+        values = []
+        for _ in range(5):
+            (length,) = struct.unpack_from("<I", buffer, position)
+            position += 4
+            if length == _NONE_LENGTH:
+                values.append(None)
+            else:
+                values.append(str(buffer[position:position + length], "utf-8"))
+                position += length
+        timestamp = None
+        if self._version >= 2:
+            (timestamp,) = struct.unpack_from("<q", buffer, position)
+            position += 8
+            if timestamp == _NO_TIMESTAMP:
+                timestamp = None
+
+        (count,) = struct.unpack_from("<I", buffer, position)
+        position += 4
+        if count == _NONE_LENGTH:
+            categories = None
+        elif count == _STRING_CATEGORIES:
+            (length,) = struct.unpack_from("<I", buffer, position)
+            categories = str(buffer[position + 4:position + 4 + length], "utf-8")
+            position += 4 + length
+        else:
+            ids = self._column('I', position, count)
+            categories = [self._string(i) for i in ids]
+            position += 4 * count
+
+        (count,) = struct.unpack_from("<I", buffer, position)
+        position += 4
+        tokens = TokenList()
+        for name in ("_text", "_lemma", "_pos"):
+            ids = self._column('I', position, count)
+            setattr(tokens, name, array('I', [self._token_id(i) for i in ids]))
+            position += 4 * count
+
+        return Article(*values, categories=categories, tokens=tokens, timestamp=timestamp)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._read_article(rank) for rank in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("indice d'article hors limites")
+        return self._read_article(index)
+
+    def __iter__(self) -> Iterator[Article]:
+        for rank in range(self._count):
+            yield self._read_article(rank)
+
+    def rank(self, article_id: str) -> Optional[int]:
+        """Rang de l'article d'identifiant donné (recherche dichotomique dans l'index), None si absent"""
+        article_hash = _id_hash(article_id)
+        i = bisect_left(self._hashes, article_hash)
+        while i < self._count and self._hashes[i] == article_hash:
+            rank = self._ranks[i]
+            (length,) = struct.unpack_from("<I", self._buffer, self._offsets[rank])
+            start = self._offsets[rank] + 4
+            if length != _NONE_LENGTH and str(self._buffer[start:start + length], "utf-8") == article_id:
+                return rank
+            i += 1
+        return None
+
+    def get(self, article_id: str, default=None) -> Optional[Article]:
+        """Retourne l'article d'identifiant donné sans lire le reste du corpus"""
+        rank = self.rank(article_id)
+        return default if rank is None else self._read_article(rank)
+
+    def __contains__(self, article_id) -> bool:
+        return self.rank(article_id) is not None
+
+    def close(self) -> None:
+        # Les vues sur le mmap doivent être libérées avant sa fermeture
+        for name in ("_vocabulary_positions", "_offsets", "_hashes", "_ranks", "_buffer"):
+            view = getattr(self, name, None)
+            if isinstance(view, memoryview):
+                view.release()
+        self._mmap.close()
+        self._file.close()
+
+    def __enter__(self) -> 'BinaryCorpus':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
 
 name_to_saver = {
     "xml": Corpus.save_xml,
     "json": Corpus.save_json,
-    "pickle": Corpus.save_pickle
+    "pickle": Corpus.save_pickle,
+    "binary": Corpus.save_binary
+}
+
+name_to_iterator = {
+    "xml": Corpus.iter_xml,
+    "json": Corpus.iter_json,
+    "pickle": Corpus.iter_pickle,
+    "binary": Corpus.iter_binary
+}
+
+name_to_writer = {
+    "xml": Corpus.write_xml,
+    "json": Corpus.write_json,
+    "pickle": Corpus.write_pickle,
+    "binary": Corpus.write_binary
 }
 
 name_to_loader = {
     "xml": Corpus.load_xml,
     "json": Corpus.load_json,
-    "pickle": Corpus.load_pickle
+    "pickle": Corpus.load_pickle,
+    "binary": Corpus.load_binary
 }
 
 
-def main(input_file, output_file, loader, saver) :
+def main(input_file, output_file, loader, saver, compact=False, start_date=None, end_date=None,
+         sources=None, categories=None) :
 
-    Corpus.load = name_to_loader[loader]
-    Corpus.save = name_to_saver[saver]
+    if start_date or end_date or sources or categories:
+        # Export filtré : l'index persistant donne directement les rangs des articles retenus
+        index = CorpusIndex.for_file(input_file, loader)
+        ranks = index.query(borne_date(start_date), borne_date(end_date), sources, categories)
+        if loader == "binary":
+            def read_ranks():
+                with BinaryCorpus(input_file) as binary_corpus:
+                    for rank in ranks:
+                        yield binary_corpus[rank]
+            articles = read_ranks()
+        else:
+            wanted = set(ranks)
+            articles = (article for rank, article in enumerate(name_to_iterator[loader](input_file))
+                        if rank in wanted)
+    else:
+        # Conversion en flux : les articles passent un par un du lecteur à l'écrivain
+        articles = name_to_iterator[loader](input_file)
 
-
-    corpus = Corpus.load(input_file)
-    corpus.save(output_file)
+    if saver == "json":
+        name_to_writer[saver](articles, output_file, compact=compact)
+    else:
+        name_to_writer[saver](articles, output_file)
 
 
 if __name__ == "__main__":
@@ -214,9 +1091,20 @@ if __name__ == "__main__":
 
     parser.add_argument("input_file", help="input serialized RSS file")
     parser.add_argument("output_file", help="output serialized RSS file")
-    parser.add_argument("-l", "--loader", choices=("xml", "json", "pickle"), required=True)
-    parser.add_argument("-s", "--saver", choices=("xml", "json", "pickle"), required=True)
+    parser.add_argument("-l", "--loader", choices=("xml", "json", "pickle", "binary"), required=True)
+    parser.add_argument("-s", "--saver", choices=("xml", "json", "pickle", "binary"), required=True)
+    parser.add_argument("--compact", action="store_true", help="compact JSON output (one article per line)")
+    parser.add_argument("--start-date", help="only export articles published after this date (YYYY-MM-DD)")
+    parser.add_argument("--end-date", help="only export articles published before this date (YYYY-MM-DD)")
+    parser.add_argument("--source", nargs="+", help="only export articles from these sources")
+    parser.add_argument("--categorie", nargs="+", help="only export articles in these categories")
 
     args = parser.parse_args()
+    for date in (args.start_date, args.end_date):
+        try:
+            borne_date(date)
+        except ValueError as e:
+            parser.error(str(e))
 
-    main(args.input_file, args.output_file, args.loader, args.saver)
+    main(args.input_file, args.output_file, args.loader, args.saver, args.compact,
+         args.start_date, args.end_date, args.source, args.categorie)
@@ -0,0 +1,120 @@
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+
+
+class EmbeddingStore:
+    """Cache persistant des embeddings d'articles pour un modèle d'encodage.
+
+    Les vecteurs sont stockés bout à bout dans une matrice float32 sur le disque (vectors.f32),
+    relue par memory-mapping ; index.json associe à chaque couple (empreinte du texte encodé,
+    identifiant d'article) sa ligne. Un article dont le texte a changé est réencodé et sa nouvelle
+    ligne est ajoutée en fin de fichier ; deux articles de même identifiant mais de textes
+    différents ont chacun leur vecteur.
+    """
+
+    def __init__(self, directory: Path, model_name: str):
+        self.model_name = model_name
+        # Un sous-dossier par modèle : des embeddings de modèles différents ne se mélangent jamais
+        self.directory = Path(directory) / re.sub(r"[^\w.-]+", "_", model_name)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.vectors_path = self.directory / "vectors.f32"
+        self.index_path = self.directory / "index.json"
+        self.hits = 0
+        self.misses = 0
+        self.dimension = None
+        self.rows = 0
+        self.index = {}
+        if self.index_path.exists():
+            with open(self.index_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            self.dimension, self.rows, self.index = meta["dimension"], meta["rows"], meta["index"]
+            # Lignes écrites après la dernière sauvegarde de l'index : ignorées
+            if self.dimension and self.vectors_path.exists():
+                with open(self.vectors_path, "r+b") as f:
+                    f.truncate(self.rows * self.dimension * 4)
+
+    @staticmethod
+    def text_hash(text: str) -> str:
+        return hashlib.sha256((text or "").encode("utf-8")).hexdigest()[:32]
+
+    @staticmethod
+    def _key(article_id, digest: str) -> str:
+        # L'empreinte a une longueur fixe : la clé reste non ambiguë quel que soit l'identifiant
+        return f"{digest}:{article_id}"
+
+    def _keys(self, ids: list, texts: list[str]) -> list[str]:
+        return [self._key(article_id, self.text_hash(text)) for article_id, text in zip(ids, texts)]
+
+    def missing(self, ids: list, texts: list[str]) -> list[int]:
+        """Positions des articles absents du cache ou dont le texte a changé"""
+        positions = []
+        seen = set()
+        for position, key in enumerate(self._keys(ids, texts)):
+            if key in self.index:
+                self.hits += 1
+            elif key not in seen:
+                self.misses += 1
+                positions.append(position)
+            seen.add(key)
+        return positions
+
+    def add(self, ids: list, texts: list[str], vectors: np.ndarray) -> None:
+        """Ajoute des vecteurs en fin de matrice et met à jour l'index en mémoire"""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if self.dimension is None:
+            self.dimension = vectors.shape[1]
+        elif vectors.shape[1] != self.dimension:
+            raise ValueError(f"Dimension {vectors.shape[1]} incompatible avec le cache ({self.dimension})")
+        with open(self.vectors_path, "ab") as f:
+            f.write(vectors.tobytes())
+        for key in self._keys(ids, texts):
+            self.index[key] = self.rows
+            self.rows += 1
+
+    def _memmap(self) -> np.memmap:
+        # Copie sur écriture : une modification en place par l'appelant ne touche jamais le fichier
+        return np.memmap(self.vectors_path, dtype=np.float32, mode="c", shape=(self.rows, self.dimension))
+
+    def matrix(self, ids: list, texts: list[str]) -> np.ndarray:
+        """Matrice des embeddings des articles, dans l'ordre de ids.
+
+        Si les articles occupent des lignes consécutives dans le même ordre (cas d'un corpus
+        déjà vu), la matrice est une vue sur le fichier, sans copie. Sinon, seules les lignes
+        demandées sont copiées ; le fichier n'est jamais réorganisé.
+        """
+        if not ids:
+            return np.empty((0, self.dimension or 0), dtype=np.float32)
+        rows = [self.index[key] for key in self._keys(ids, texts)]
+        if rows == list(range(rows[0], rows[0] + len(rows))):
+            return self._memmap()[rows[0]:rows[0] + len(rows)]
+        return np.array(self._memmap()[rows])
+
+    def embed(self, ids: list, texts: list[str], encode: Callable[[list[str]], np.ndarray],
+              batch_size: int = 256) -> np.ndarray:
+        """Encode par lots les seuls articles nouveaux ou modifiés, puis retourne la matrice complète"""
+        positions = self.missing(ids, texts)
+        for first in range(0, len(positions), batch_size):
+            batch = positions[first:first + batch_size]
+            batch_texts = [texts[position] for position in batch]
+            self.add([ids[position] for position in batch], batch_texts, encode(batch_texts))
+        if positions:
+            self.save()
+        return self.matrix(ids, texts)
+
+    def save(self) -> None:
+        """Écrit l'index de façon atomique"""
+        tmp = self.index_path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"model": self.model_name, "dimension": self.dimension, "rows": self.rows,
+                       "index": self.index}, f, ensure_ascii=False)
+        os.replace(tmp, self.index_path)
+
+    def stats(self) -> dict:
+        """Statistiques du cache : succès, échecs, entrées et lignes (y compris inutilisées)"""
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self.index), "rows": self.rows}
@@ -0,0 +1,273 @@
+"""
+Chaîne complète en un seul processus : collecte -> filtrage -> dédoublonnage -> analyse -> thèmes.
+
+Les étapes se passent des flux d'`Article` au lieu de fichiers intermédiaires. Avec --queue-size,
+chaque étape tourne dans son propre fil d'exécution, reliée à la suivante par une file bornée :
+la lecture des flux RSS (entrées/sorties) avance pendant l'analyse (calcul). Le corpus n'est écrit
+sur le disque qu'aux points de contrôle demandés (--checkpoint etape=fichier).
+
+Exemple : python3 pipeline.py Corpus/ --analyzer stanza --quasi-doublons --queue-size 256 \\
+              --checkpoint dedup=corpus.json --checkpoint analyze=corpus_analyse.pickle --topics lda
+"""
+import argparse
+import os
+import queue
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from datastructures import Article, article_matches, borne_date, name_to_iterator, name_to_writer
+import rss_parcours
+
+ETAPES = ("crawl", "filter", "dedup", "analyze")
+_FIN = object()
+
+
+def format_fichier(chemin: str) -> str:
+    """Format de sérialisation déduit de l'extension (json par défaut, comme rss_parcours)"""
+    extension = os.path.splitext(chemin)[1][1:].lower()
+    extension = {'pkl': 'pickle', 'bin': 'binary'}.get(extension, extension)
+    return extension if extension in name_to_writer else 'json'
+
+
+def en_file(articles: Iterable, taille: int, nom: str) -> Iterator:
+    """Exécute l'étape amont dans un fil dédié et en transmet les articles par une file bornée.
+
+    Une exception de l'étape amont est relancée dans l'étape aval.
+    """
+    file = queue.Queue(maxsize=taille)
+    erreurs = []
+
+    def produire():
+        try:
+            for article in articles:
+                file.put(article)
+        except BaseException as e:
+            erreurs.append(e)
+        finally:
+            file.put(_FIN)
+
+    threading.Thread(target=produire, name=f"etape-{nom}", daemon=True).start()
+    while (article := file.get()) is not _FIN:
+        yield article
+    if erreurs:
+        raise erreurs[0]
+
+
+def point_de_controle(articles: Iterable[Article], chemin: str, compact: bool = False) -> Iterator[Article]:
+    """Écrit les articles dans chemin au passage, sans interrompre le flux vers l'étape suivante"""
+    format = format_fichier(chemin)
+    file = queue.Queue(maxsize=1024)
+    resultat = {}
+
+    def a_ecrire():
+        while (article := file.get()) is not _FIN:
+            yield article
+
+    def ecrire():
+        try:
+            options = {"compact": compact} if format == "json" else {}
+            resultat["nombre"] = name_to_writer[format](a_ecrire(), chemin, **options)
+        except BaseException as e:
+            resultat["erreur"] = e
+            # Vider la file pour ne pas bloquer l'étape qui écrit dedans
+            for _ in a_ecrire():
+                pass
+
+    ecrivain = threading.Thread(target=ecrire, name=f"controle-{chemin}", daemon=True)
+    ecrivain.start()
+    try:
+        for article in articles:
+            file.put(article)
+            yield article
+    finally:
+        file.put(_FIN)
+        ecrivain.join()
+    if "erreur" in resultat:
+        raise resultat["erreur"]
+    print(f"Point de contrôle : {resultat['nombre']} articles écrits dans {chemin}")
+
+
+def compter(articles: Iterable[Article], nom: str, compteurs: dict) -> Iterator[Article]:
+    """Compte les articles qui sortent d'une étape"""
+    compteurs[nom] = 0
+    for article in articles:
+        compteurs[nom] += 1
+        yield article
+
+
+def collecte(entree: str, lecture: str, method: str, jobs: int = 1) -> Iterator[Article]:
+    """Articles d'un dossier de flux RSS, ou d'un corpus déjà sérialisé"""
+    if os.path.isfile(entree):
+        return name_to_iterator[format_fichier(entree)](entree)
+    return rss_parcours.iter_articles_fichiers(method, rss_parcours.lister_fichiers(lecture, entree), jobs=jobs)
+
+
+def filtre(articles: Iterable[Article], date_debut=None, date_fin=None, sources=None, categories=None) -> Iterator[Article]:
+    """Filtrage article par article, avec les mêmes critères que rss_reader.filtrage (CorpusIndex.query)"""
+    debut, fin = borne_date(date_debut), borne_date(date_fin)
+    for article in articles:
+        if article_matches(article, debut, fin, sources, categories):
+            yield article
+
+
+def dedoublonnage(articles: Iterable[Article], detecteur=None) -> Iterator[Article]:
+    """Doublons exacts (même id), puis quasi-doublons si un détecteur est donné"""
+    vus = set()
+    for article in articles:
+        if article.id and article.id not in vus:
+            vus.add(article.id)
+            if detecteur is None or detecteur.original(article) is None:
+                yield article
+
+
+def themes_lda(articles: list[Article], methode: str, pos=None, num_topics: int = 10, workers: int = 1) -> None:
+    """Modèle LDA sur les tokens des articles analysés (prétraitement de run_lda)"""
+    import run_lda
+
+    docs = run_lda.preprocess_documents(run_lda.tokenize_articles(articles), methode, pos)
+    phrases = run_lda.train_phrases(docs)
+    dictionary, corpus = run_lda.build_bow(run_lda.bigrams(docs, phrases))
+    if len(dictionary) == 0 or len(corpus) == 0:
+        print("Erreur : le dictionnaire ou le corpus est vide après filtrage (les articles ont-ils été analysés ?)")
+        return
+    model = run_lda.train_lda(dictionary, corpus, workers=workers, num_topics=num_topics)
+    avg_topic_coherence, top_topics = run_lda.average_coherence(model, corpus)
+    print(f'Average topic coherence: {avg_topic_coherence:.4f}')
+    run_lda.pprint(top_topics)
+
+
+def themes_bertopic(articles: list[Article], embedding_cache: str = "embedding_cache") -> None:
+    """Modèle BERTopic sur les descriptions (modèles et cache d'embeddings de bertopicdemo)"""
+    import bertopicdemo
+    from embedding_cache import EmbeddingStore
+
+    articles = [article for article in articles if article.description is not None]
+    docs = [article.description for article in articles]
+    ids = [article.id or EmbeddingStore.text_hash(article.description) for article in articles]
+    embedding_model = bertopicdemo.get_embedding_model()
+    store = EmbeddingStore(embedding_cache, bertopicdemo.EMBEDDING_MODEL_NAME)
+    embeddings = store.embed(ids, docs, embedding_model.encode)
+    topic_model, vectorizer_model = bertopicdemo.build_topic_model()
+    topic_model.fit_transform(docs, embeddings)
+    topic_model.update_topics(docs, vectorizer_model=vectorizer_model)
+    print(topic_model.get_topic_info())
+
+
+def points_de_controle(valeurs: list[str]) -> dict:
+    """Analyse les options --checkpoint etape=fichier"""
+    controles = {}
+    for valeur in valeurs or ():
+        etape, _, chemin = valeur.partition("=")
+        if etape not in ETAPES or not chemin:
+            raise argparse.ArgumentTypeError(f"Point de contrôle invalide : {valeur} (attendu : etape=fichier, "
+                                             f"etape parmi {', '.join(ETAPES)})")
+        controles[etape] = chemin
+    return controles
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chaîne complète : collecte, filtrage, dédoublonnage, analyse et thèmes")
+    parser.add_argument("entree", help="Dossier de flux RSS, ou corpus déjà sérialisé (json, xml, pickle, binary)")
+    parser.add_argument("--lecture", choices=["glob", "os", "path"], default="path", help="Parcours du dossier d'entrée")
+    parser.add_argument("--method", choices=["regex", "etree", "feedparser"], default="etree", help="Méthode d'extraction")
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="Processus de lecture des fichiers XML")
+    parser.add_argument("--start-date", help="Filtrer les articles publiés après cette date (format YYYY-MM-DD)")
+    parser.add_argument("--end-date", help="Filtrer les articles publiés avant cette date (format YYYY-MM-DD)")
+    parser.add_argument("--source", nargs="+", help="Filtrer par une ou plusieurs sources")
+    parser.add_argument("--categorie", nargs="+", help="Filtrer par une ou plusieurs catégories")
+    parser.add_argument("--quasi-doublons", type=float, nargs="?", const=0.8, metavar="SEUIL",
+                        help="Supprimer aussi les quasi-doublons (similarité de Jaccard estimée >= SEUIL)")
+    parser.add_argument("--signatures", help="Magasin persistant des signatures (quasi-doublons entre exécutions)")
+    parser.add_argument("--analyzer", choices=["none", "trankit", "stanza"], default="none", help="Analyseur syntaxique")
+    parser.add_argument("--batch-size", type=int, default=32, help="Articles envoyés ensemble à Stanza")
+    parser.add_argument("--workers", type=int, default=1, help="Processus d'analyse Stanza")
+    parser.add_argument("--cache", default="analysis_cache.sqlite", help="Cache persistant des analyses")
+    parser.add_argument("--no-cache", action="store_true", help="Désactiver le cache des analyses")
+    parser.add_argument("--topics", choices=["none", "lda", "bertopic"], default="none", help="Modèle de thèmes final")
+    parser.add_argument("--lda-methode", choices=["lemme", "mot-forme"], default="lemme", help="Termes du modèle LDA")
+    parser.add_argument("--pos", nargs="*", help="Catégories grammaticales retenues pour LDA")
+    parser.add_argument("--num-topics", type=int, default=10, help="Nombre de thèmes LDA")
+    parser.add_argument("--queue-size", type=int, default=0,
+                        help="Taille des files entre étapes exécutées en parallèle (0 : étapes enchaînées dans un seul fil)")
+    parser.add_argument("--checkpoint", action="append", metavar="ETAPE=FICHIER",
+                        help=f"Écrire le flux en sortie d'une étape ({', '.join(ETAPES)}) ; répétable")
+    parser.add_argument("--output", "-o", help="Fichier du corpus final (équivaut à --checkpoint analyze=FICHIER)")
+    parser.add_argument("--compact", action="store_true", help="Points de contrôle JSON compacts (un article par ligne)")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.entree):
+        print(f"Erreur : '{args.entree}' n'existe pas.")
+        sys.exit(1)
+    try:
+        controles = points_de_controle(args.checkpoint)
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+    if args.output:
+        controles["analyze"] = args.output
+
+    compteurs = {}
+    debut = time.perf_counter()
+
+    def sortie_etape(flux, nom):
+        flux = compter(flux, nom, compteurs)
+        if nom in controles:
+            flux = point_de_controle(flux, controles[nom], compact=args.compact)
+        if args.queue_size > 0:
+            flux = en_file(flux, args.queue_size, nom)
+        return flux
+
+    flux = sortie_etape(collecte(args.entree, args.lecture, args.method, jobs=args.jobs), "crawl")
+
+    if args.start_date or args.end_date or args.source or args.categorie:
+        flux = sortie_etape(filtre(flux, args.start_date, args.end_date, args.source, args.categorie), "filter")
+
+    detecteur = None
+    if args.quasi_doublons is not None:
+        from quasi_doublons import DetecteurQuasiDoublons
+        try:
+            detecteur = DetecteurQuasiDoublons(args.quasi_doublons, chemin=args.signatures)
+        except ValueError as e:
+            # Magasin de signatures créé avec une autre configuration, comme dans rss_parcours
+            print(f"Erreur : {e}")
+            sys.exit(1)
+    flux = sortie_etape(dedoublonnage(flux, detecteur), "dedup")
+
+    cache = None
+    if args.analyzer != "none":
+        import analyzers
+        from analysis_cache import AnalysisCache
+        if not args.no_cache:
+            cache = AnalysisCache(Path(args.cache))
+            analyzers.set_analysis_cache(cache)
+        flux = analyzers.iter_analyse(flux, args.analyzer, batch_size=args.batch_size, workers=args.workers)
+    flux = sortie_etape(flux, "analyze")
+
+    # Les modèles de thèmes parcourent le corpus plusieurs fois : seule cette étape le garde en mémoire
+    if args.topics == "none":
+        for _ in flux:
+            pass
+        articles = None
+    else:
+        articles = list(flux)
+
+    if detecteur is not None:
+        detecteur.close()
+        print(detecteur.rapport())
+    if cache is not None:
+        stats = cache.stats()
+        print(f"Cache des analyses : {stats['hits']} succès, {stats['misses']} échecs")
+        cache.close()
+    print("Articles en sortie de chaque étape :", compteurs)
+    print(f"Durée jusqu'à l'analyse incluse : {time.perf_counter() - debut:.1f} s")
+
+    if args.topics == "lda":
+        themes_lda(articles, args.lda_methode, args.pos, num_topics=args.num_topics, workers=args.workers)
+    elif args.topics == "bertopic":
+        themes_bertopic(articles)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Détection des quasi-doublons (dépêche reprise par plusieurs sources, article republié sous une autre URL)
+par signatures MinHash des shingles de mots de `titre + description` et indexation LSH par bandes.
+
+Chaque article n'est comparé qu'aux articles qui partagent au moins une bande de signature avec lui :
+le coût est linéaire en nombre d'articles. Les signatures des articles conservés peuvent être
+persistées (SQLite) pour qu'une exécution incrémentale compare les nouveaux articles aux anciens.
+"""
+import random
+import re
+import sqlite3
+import zlib
+from array import array
+from collections import Counter
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+from datastructures import Article
+
+_MOT = re.compile(r"\w+")
+_MASQUE = (1 << 64) - 1
+
+
+def parametres_lsh(seuil: float, nb_permutations: int) -> tuple[int, int]:
+    """(bandes, lignes) dont le seuil de détection (1/b)^(1/r) est le plus proche du seuil de similarité"""
+    candidats = [(b, nb_permutations // b) for b in range(1, nb_permutations + 1) if nb_permutations % b == 0]
+    return min(candidats, key=lambda br: abs((1 / br[0]) ** (1 / br[1]) - seuil))
+
+
+class DetecteurQuasiDoublons:
+    """Détecteur de quasi-doublons par MinHash/LSH.
+
+    Un article est un quasi-doublon si la similarité de Jaccard estimée de ses shingles avec un article
+    déjà conservé atteint le seuil. Seuls les articles conservés sont indexés (et persistés si chemin
+    est donné) : le premier article vu d'une dépêche reste l'original.
+    """
+
+    def __init__(self, seuil: float = 0.8, nb_permutations: int = 64, taille_shingle: int = 3,
+                 chemin: Optional[Path] = None, graine: int = 1):
+        self.seuil = seuil
+        self.nb_permutations = nb_permutations
+        self.taille_shingle = taille_shingle
+        self.bandes, self.lignes = parametres_lsh(seuil, nb_permutations)
+        # Fonctions de hachage h(x) = (a.x + b) mod 2^64, a impair : fixées par la graine pour être persistables
+        rng = random.Random(graine)
+        self._coefficients = [(rng.getrandbits(64) | 1, rng.getrandbits(64)) for _ in range(nb_permutations)]
+        # numpy, s'il est installé, calcule les signatures en une opération vectorielle (l'arithmétique
+        # uint64 de numpy est modulo 2^64 : les signatures sont identiques à celles du calcul en Python)
+        try:
+            import numpy
+            self._numpy = numpy
+            self._a = numpy.array([a for a, _ in self._coefficients], dtype=numpy.uint64)[:, None]
+            self._b = numpy.array([b for _, b in self._coefficients], dtype=numpy.uint64)[:, None]
+        except ImportError:
+            self._numpy = None
+        self.doublons_par_source = Counter()
+        self.nb_articles = 0
+        self.nb_doublons = 0
+
+        self._connexion = None
+        self._buckets = {}
+        self._signatures = {}
+        if chemin is not None:
+            self._ouvrir(Path(chemin), graine)
+
+    def _ouvrir(self, chemin: Path, graine: int) -> None:
+        # Utilisé par une seule étape à la fois, mais pas forcément dans le fil qui l'a ouvert (pipeline.py)
+        self._connexion = sqlite3.connect(str(chemin), check_same_thread=False)
+        self._connexion.execute("CREATE TABLE IF NOT EXISTS meta (cle TEXT PRIMARY KEY, valeur TEXT NOT NULL)")
+        self._connexion.execute(
+            "CREATE TABLE IF NOT EXISTS signatures (id TEXT PRIMARY KEY, source TEXT, signature BLOB NOT NULL)")
+        self._connexion.execute("CREATE TABLE IF NOT EXISTS bandes (cle BLOB NOT NULL, id TEXT NOT NULL)")
+        self._connexion.execute("CREATE INDEX IF NOT EXISTS bandes_cle ON bandes (cle)")
+        configuration = f"{self.nb_permutations}:{self.taille_shingle}:{self.bandes}x{self.lignes}:{graine}"
+        ligne = self._connexion.execute("SELECT valeur FROM meta WHERE cle = 'configuration'").fetchone()
+        if ligne is None:
+            self._connexion.execute("INSERT INTO meta VALUES ('configuration', ?)", (configuration,))
+        elif ligne[0] != configuration:
+            raise ValueError(f"Le magasin de signatures {chemin} a été créé avec une autre configuration "
+                             f"({ligne[0]}, demandée : {configuration}) ; supprimez-le pour le reconstruire")
+
+    def shingles(self, texte: str) -> set[int]:
+        """Empreintes (crc32) des suites de taille_shingle mots du texte normalisé"""
+        mots = _MOT.findall(texte.lower())
+        if len(mots) < self.taille_shingle:
+            return {zlib.crc32(" ".join(mots).encode("utf-8"))} if mots else set()
+        return {zlib.crc32(" ".join(mots[i:i + self.taille_shingle]).encode("utf-8"))
+                for i in range(len(mots) - self.taille_shingle + 1)}
+
+    def signature(self, texte: str) -> Optional[array]:
+        """Signature MinHash du texte, ou None s'il ne contient aucun mot"""
+        empreintes = self.shingles(texte)
+        if not empreintes:
+            return None
+        if self._numpy is not None:
+            x = self._numpy.fromiter(empreintes, dtype=self._numpy.uint64, count=len(empreintes))
+            signature = array('Q')
+            signature.frombytes((self._a * x + self._b).min(axis=1).tobytes())
+            return signature
+        return array('Q', [min([(a * x + b) & _MASQUE for x in empreintes]) for a, b in self._coefficients])
+
+    def _cles_bandes(self, signature: array) -> list[bytes]:
+        return [bande.to_bytes(2, "little") + signature[bande * self.lignes:(bande + 1) * self.lignes].tobytes()
+                for bande in range(self.bandes)]
+
+    def _similarite(self, signature: array, autre: array) -> float:
+        """Similarité de Jaccard estimée : part des composantes égales des deux signatures"""
+        return sum(1 for x, y in zip(signature, autre) if x == y) / self.nb_permutations
+
+    def _candidats(self, cles: list[bytes]) -> set[str]:
+        candidats = set()
+        for cle in cles:
+            candidats.update(self._buckets.get(cle, ()))
+        if self._connexion is not None:
+            for cle in cles:
+                candidats.update(id_ for (id_,) in self._connexion.execute("SELECT id FROM bandes WHERE cle = ?", (cle,)))
+        return candidats
+
+    def _signature_connue(self, id_article: str) -> Optional[array]:
+        signature = self._signatures.get(id_article)
+        if signature is None and self._connexion is not None:
+            ligne = self._connexion.execute("SELECT signature FROM signatures WHERE id = ?", (id_article,)).fetchone()
+            if ligne is not None:
+                signature = array('Q')
+                signature.frombytes(ligne[0])
+        return signature
+
+    def original(self, article: Article) -> Optional[str]:
+        """Identifiant de l'article conservé dont celui-ci est un quasi-doublon, ou None.
+
+        Un article qui n'est pas un quasi-doublon est indexé et devient un original potentiel.
+        """
+        self.nb_articles += 1
+        if article.id is not None and self._signature_connue(article.id) is not None:
+            # Article déjà conservé lors d'une exécution précédente
+            return None
+        signature = self.signature(f"{article.title or ''} {article.description or ''}")
+        if signature is None:
+            return None
+        cles = self._cles_bandes(signature)
+        for candidat in self._candidats(cles):
+            if candidat != article.id and self._similarite(signature, self._signature_connue(candidat)) >= self.seuil:
+                self.nb_doublons += 1
+                self.doublons_par_source[article.source] += 1
+                return candidat
+
+        id_article = article.id if article.id is not None else f"sans-id:{self.nb_articles}"
+        if self._connexion is not None:
+            self._connexion.execute("INSERT OR REPLACE INTO signatures VALUES (?, ?, ?)",
+                                    (id_article, article.source, signature.tobytes()))
+            self._connexion.executemany("INSERT INTO bandes VALUES (?, ?)", [(cle, id_article) for cle in cles])
+        else:
+            self._signatures[id_article] = signature
+            for cle in cles:
+                self._buckets.setdefault(cle, []).append(id_article)
+        return None
+
+    def filtrer(self, articles: Iterable[Article]) -> Iterator[Article]:
+        """Ne laisse passer que les articles qui ne sont pas des quasi-doublons d'un article déjà vu"""
+        for article in articles:
+            if self.original(article) is None:
+                yield article
+
+    def rapport(self) -> str:
+        """Résumé : nombre de quasi-doublons et leur répartition par source"""
+        lignes = [f"Quasi-doublons (seuil {self.seuil}, {self.bandes} bandes x {self.lignes} lignes) : "
+                  f"{self.nb_doublons} sur {self.nb_articles} articles"]
+        for source, nombre in self.doublons_par_source.most_common():
+            lignes.append(f"  {source}: {nombre}")
+        return "\n".join(lignes)
+
+    def close(self) -> None:
+        if self._connexion is not None:
+            self._connexion.commit()
+            self._connexion.close()
+            self._connexion = None
+
+    def __enter__(self) -> 'DetecteurQuasiDoublons':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,52 @@
+"""
+Ressources des modèles (nltk, stanza) : vérifiées et téléchargées au premier usage, jamais à l'import.
+
+Avec PPE2_OFFLINE=1 (ou HF_HUB_OFFLINE=1, déjà respecté par les modèles Hugging Face),
+aucun téléchargement n'est tenté : une ressource absente est signalée avec la commande
+pour l'installer.
+"""
+import os
+import sys
+from functools import lru_cache
+from pathlib import Path
+
+
+def hors_ligne() -> bool:
+    """Vrai si les téléchargements sont interdits"""
+    return any(os.environ.get(variable, "") not in ("", "0") for variable in ("PPE2_OFFLINE", "HF_HUB_OFFLINE"))
+
+
+def exiger_nltk(ressource: str, chemin: str) -> None:
+    """Vérifie qu'une ressource nltk est installée, la télécharge sinon (sauf hors ligne)"""
+    import nltk
+    try:
+        nltk.data.find(chemin)
+        return
+    except LookupError:
+        pass
+    if hors_ligne() or not nltk.download(ressource, quiet=True):
+        print(f"Erreur : ressource nltk '{ressource}' absente"
+              + (" (mode hors ligne)" if hors_ligne() else "")
+              + f". Installez-la avec : python -m nltk.downloader {ressource}")
+        sys.exit(1)
+
+
+@lru_cache(maxsize=None)
+def stopwords_nltk(langue: str) -> tuple[str, ...]:
+    """Liste des mots vides nltk d'une langue"""
+    exiger_nltk("stopwords", "corpora/stopwords")
+    from nltk.corpus import stopwords
+    return tuple(stopwords.words(langue))
+
+
+def exiger_stanza(langue: str) -> None:
+    """Vérifie que le modèle Stanza d'une langue est installé, le télécharge sinon (sauf hors ligne)"""
+    dossier = Path(os.environ.get("STANZA_RESOURCES_DIR", Path.home() / "stanza_resources")) / langue
+    if dossier.is_dir():
+        return
+    if hors_ligne():
+        print(f"Erreur : modèle Stanza '{langue}' absent de {dossier.parent} (mode hors ligne). "
+              f"Installez-le avec : python -c \"import stanza; stanza.download('{langue}')\"")
+        sys.exit(1)
+    import stanza
+    stanza.download(langue)
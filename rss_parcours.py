@@ -1,10 +1,14 @@
 import os
 import sys
 import argparse
+import hashlib
+import json
 from pathlib import Path
-from datetime import datetime
-from datastructures import Corpus, Article
+from datastructures import name_to_writer, name_to_iterator
 import rss_reader
+from quasi_doublons import DetecteurQuasiDoublons
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
 
 def lire_corpus_glob(dossier_entree):
 	"""Parcourt récursivement un dossier avec Path.glob() et récupère tous les fichiers XML"""
@@ -50,8 +54,17 @@ def lire_corpus_path(dossier_entree):
 	recursive(path_to_files)
 	return xml_files
 
-def run_method(method, lecture, dossier_entree):
-	"""Appelle la méthode sélectionnée avec les fichiers XML"""
+def _lire_fichier(method, file):
+	"""Lit un fichier XML (éventuellement dans un processus de travail) ; retourne (fichier, articles, erreur)"""
+	method_func = {"regex": rss_reader.lire_rss_regex, "etree": rss_reader.lire_rss_etree,
+				   "feedparser": rss_reader.lire_rss_feedparser}
+	try:
+		return file, method_func[method](file), None
+	except Exception as e:
+		return file, [], e
+
+def lister_fichiers(lecture, dossier_entree):
+	"""Liste les fichiers XML du dossier avec le module de lecture choisi"""
 	lire_func = {"glob": lire_corpus_glob, "os": lire_corpus_os, "path": lire_corpus_path}
 	
 	if lecture not in lire_func:
@@ -60,26 +73,130 @@ def run_method(method, lecture, dossier_entree):
 		
 	xml_files = lire_func[lecture](dossier_entree)
 	print(f"Nombre de fichiers XML trouvés: {len(xml_files)}")
+	return xml_files
 
-	method_func = {"etree": rss_reader.lire_rss_etree, "feedparser": rss_reader.lire_rss_feedparser}
-	
-	if method not in method_func:
-		print("Erreur : Méthode d'extraction invalide. Utilisez 'etree' ou 'feedparser'.")
+def _lectures_paralleles(executor, method, xml_files, fenetre):
+	"""Résultats de _lire_fichier dans l'ordre des fichiers, avec au plus fenetre lectures en cours :
+	les fichiers sont soumis au fur et à mesure, et non tous dès le départ"""
+	en_cours = deque()
+	for file in xml_files:
+		en_cours.append(executor.submit(_lire_fichier, method, file))
+		if len(en_cours) >= fenetre:
+			yield en_cours.popleft().result()
+	while en_cours:
+		yield en_cours.popleft().result()
+
+def iter_articles_fichiers(method, xml_files, jobs=1, fichiers_traites=None, fichiers_en_erreur=None):
+	"""Produit les articles d'une liste de fichiers XML au fur et à mesure, dans l'ordre des fichiers.
+
+	Avec jobs > 1, les fichiers sont lus par un pool de processus.
+	Si fichiers_traites est une liste, on y ajoute les fichiers lus sans erreur ;
+	si fichiers_en_erreur est une liste, on y ajoute les couples (fichier, erreur) des autres.
+	"""
+	if method not in ("regex", "etree", "feedparser"):
+		print("Erreur : Méthode d'extraction invalide. Utilisez 'regex', 'etree' ou 'feedparser'.")
 		sys.exit(1)
 
-	all_articles = []
-	for file in xml_files:
-		try:
-			articles = method_func[method](file)
-			all_articles.extend(articles)
+	if jobs > 1:
+		executor = ProcessPoolExecutor(max_workers=jobs)
+		resultats = _lectures_paralleles(executor, method, xml_files, 2 * jobs)
+	else:
+		executor = None
+		resultats = (_lire_fichier(method, file) for file in xml_files)
+
+	total = 0
+	try:
+		for file, articles, erreur in resultats:
+			if erreur is not None:
+				print(f"Impossible de traiter le fichier {file}, erreur: {erreur}")
+				if fichiers_en_erreur is not None:
+					fichiers_en_erreur.append((file, erreur))
+				continue
 			print(f"Fichier traité: {file} - {len(articles)} articles extraits")
-		except Exception as e:
-			print(f"Impossible de traiter le fichier {file}, erreur: {e}")
+			total += len(articles)
+			if fichiers_traites is not None:
+				fichiers_traites.append(file)
+			yield from articles
+	finally:
+		if executor is not None:
+			executor.shutdown(cancel_futures=True)
+
+	print(f"Total des articles collectés: {total}")
+
+def iter_articles(method, lecture, dossier_entree, jobs=1):
+	"""Produit les articles de tous les fichiers XML du dossier"""
+	xml_files = lister_fichiers(lecture, dossier_entree)
+	yield from iter_articles_fichiers(method, xml_files, jobs=jobs)
+
+def empreinte_fichier(file):
+	"""Empreinte SHA-256 du contenu d'un fichier"""
+	empreinte = hashlib.sha256()
+	with open(file, 'rb') as f:
+		for bloc in iter(lambda: f.read(1 << 20), b""):
+			empreinte.update(bloc)
+	return empreinte.hexdigest()
+
+def entree_manifeste(file):
+	"""Entrée du manifeste d'un fichier : date de modification, taille et empreinte"""
+	stat = os.stat(file)
+	return {"mtime": stat.st_mtime, "size": stat.st_size, "sha256": empreinte_fichier(file)}
+
+def charger_manifeste(chemin_manifeste):
+	"""Charge le manifeste des fichiers déjà intégrés : chemin -> {mtime, size, sha256[, erreur]}"""
+	if not os.path.isfile(chemin_manifeste):
+		return {}
+	with open(chemin_manifeste, 'r', encoding='utf-8') as f:
+		return json.load(f)
+
+def sauvegarder_manifeste(manifeste, chemin_manifeste):
+	"""Sauvegarde le manifeste (écriture dans un fichier temporaire puis remplacement)"""
+	temporaire = f"{chemin_manifeste}.tmp"
+	with open(temporaire, 'w', encoding='utf-8') as f:
+		json.dump(manifeste, f, ensure_ascii=False, indent=1)
+	os.replace(temporaire, chemin_manifeste)
+
+def fichiers_modifies(xml_files, manifeste):
+	"""Sépare les fichiers nouveaux ou modifiés de ceux déjà intégrés.
+
+	Un fichier dont la date de modification et la taille n'ont pas changé n'est pas relu ;
+	sinon on compare l'empreinte de son contenu. Un fichier illisible lors d'une exécution précédente
+	(entrée marquée "erreur") n'est relu que s'il a changé. Retourne (fichiers à lire, entrées à jour du manifeste).
+	"""
+	a_lire = []
+	entrees = {}
+	en_erreur = 0
+	for file in xml_files:
+		chemin = str(file)
+		stat = os.stat(file)
+		entree = manifeste.get(chemin)
+		if entree and entree["mtime"] == stat.st_mtime and entree["size"] == stat.st_size:
+			en_erreur += "erreur" in entree
+			continue
+		entrees[chemin] = entree_manifeste(file)
+		if entree and entree["sha256"] == entrees[chemin]["sha256"]:
+			# Fichier touché mais contenu identique
+			if "erreur" in entree:
+				entrees[chemin]["erreur"] = entree["erreur"]
+				en_erreur += 1
+			continue
+		a_lire.append(file)
+	if en_erreur:
+		print(f"Fichiers illisibles inchangés depuis l'échec, ignorés: {en_erreur}")
+	return a_lire, entrees
 
-	return all_articles
+def fusionner(existants, nouveaux):
+	"""Fusionne de nouveaux articles dans un corpus existant ; un article déjà présent est remplacé par sa nouvelle version"""
+	fusion = {article.id: article for article in existants}
+	for article in nouveaux:
+		fusion[article.id] = article
+	return list(fusion.values())
+
+def run_method(method, lecture, dossier_entree, jobs=1):
+	"""Appelle la méthode sélectionnée avec les fichiers XML"""
+	return list(iter_articles(method, lecture, dossier_entree, jobs=jobs))
 
 def supprimer_doublons(articles):
-	"""Supprime les doublons d'articles basés sur leur l'id"""
+	"""Supprime les doublons d'articles basés sur leur l'id, au fur et à mesure que les articles arrivent"""
 	vus = set()
 	uniques = []
 	for article in articles:
@@ -102,43 +219,102 @@ def main():
 	parser.add_argument("--source", nargs="+", help="Filtrer par une ou plusieurs sources")
 	parser.add_argument("--categorie", nargs="+", help="Filtrer par une ou plusieurs catégories")
 	parser.add_argument("--output", "-o", help="Fichier de sortie (format: json, xml, ou pickle)", default="output.json")
+	parser.add_argument("--compact", action="store_true", help="Sortie JSON compacte (un article par ligne)")
+	parser.add_argument("--jobs", "-j", type=int, default=1, help="Nombre de processus pour lire les fichiers XML en parallèle")
+	parser.add_argument("--incremental", action="store_true",
+						help="Ne lire que les fichiers nouveaux ou modifiés et les fusionner dans le fichier de sortie existant")
+	parser.add_argument("--manifest", help="Manifeste des fichiers déjà intégrés (par défaut : <output>.manifest.json)")
+	parser.add_argument("--rebuild", action="store_true", help="Avec --incremental, tout relire et reconstruire la sortie")
+	parser.add_argument("--quasi-doublons", type=float, nargs="?", const=0.8, metavar="SEUIL",
+						help="Supprimer les quasi-doublons (similarité de Jaccard estimée >= SEUIL, 0.8 par défaut)")
+	parser.add_argument("--signatures", help="Magasin des signatures des articles conservés (par défaut : <output>.signatures.sqlite)")
 	args = parser.parse_args()
 
 	if not os.path.isdir(args.dossier_entree):
 		print(f"Erreur : Le dossier '{args.dossier_entree}' n'existe pas.")
 		sys.exit(1)
 
-	# Collecter tous les articles
-	articles = run_method(args.method, args.lecture, args.dossier_entree)
-	print(f"Total des articles collectés: {len(articles)}")
+	# Déterminer le format de sortie à partir de l'extension du fichier
+	output_format = os.path.splitext(args.output)[1][1:].lower() if '.' in args.output else 'json'
+	output_format = {'pkl': 'pickle', 'bin': 'binary'}.get(output_format, output_format)
+	
+	if output_format not in name_to_writer:
+		print(f"Format de sortie non pris en charge: {output_format}. Utilisation de JSON par défaut.")
+		output_format = 'json'
+
+	xml_files = lister_fichiers(args.lecture, args.dossier_entree)
+	chemin_manifeste = args.manifest or f"{args.output}.manifest.json"
+	manifeste = {}
+	fichiers_traites = []
+	fichiers_en_erreur = []
+	if args.incremental and not args.rebuild:
+		manifeste = charger_manifeste(chemin_manifeste)
+		a_lire, entrees = fichiers_modifies(xml_files, manifeste)
+		print(f"Fichiers nouveaux ou modifiés: {len(a_lire)}")
+		# Les fichiers à relire ne seront inscrits au manifeste qu'une fois lus sans erreur
+		chemins_a_lire = {str(file) for file in a_lire}
+		manifeste.update({chemin: entree for chemin, entree in entrees.items() if chemin not in chemins_a_lire})
+		if not a_lire and os.path.isfile(args.output):
+			sauvegarder_manifeste(manifeste, chemin_manifeste)
+			print(f"Aucun fichier nouveau : {args.output} est à jour.")
+			return
+	else:
+		a_lire = xml_files
+		entrees = {}
 
-	articles = supprimer_doublons(articles)
+	# Collecter les articles, les doublons sont supprimés à mesure que les fichiers sont lus
+	articles = supprimer_doublons(iter_articles_fichiers(args.method, a_lire, jobs=args.jobs,
+														 fichiers_traites=fichiers_traites,
+														 fichiers_en_erreur=fichiers_en_erreur))
 	print(f"Articles après suppression des doublons: {len(articles)}")
 
-	# Créer le corpus
-	# Créer le corpus
-	corpus = Corpus(articles)
-	
 	# Appliquer les filtres si nécessaire
 	if args.start_date or args.end_date or args.source or args.categorie:
-		articles_filtres = rss_reader.filtrage(articles, args.start_date, args.end_date, args.source, args.categorie)
-		corpus = Corpus(articles_filtres)
-		print(f"Articles après filtrage: {len(articles_filtres)}")
-	
-	# Sérialiser le résultat
-	output_format = os.path.splitext(args.output)[1][1:].lower() if '.' in args.output else 'json'
+		articles = rss_reader.filtrage(articles, args.start_date, args.end_date, args.source, args.categorie)
+		print(f"Articles après filtrage: {len(articles)}")
+
+	# Quasi-doublons : les signatures des articles conservés sont persistées, les nouveaux articles
+	# sont donc aussi comparés à ceux des exécutions précédentes
+	if args.quasi_doublons is not None:
+		chemin_signatures = args.signatures or f"{args.output}.signatures.sqlite"
+		if args.rebuild and os.path.isfile(chemin_signatures):
+			os.remove(chemin_signatures)
+		try:
+			detecteur = DetecteurQuasiDoublons(args.quasi_doublons, chemin=chemin_signatures)
+		except ValueError as e:
+			print(f"Erreur : {e}")
+			sys.exit(1)
+		with detecteur:
+			articles = list(detecteur.filtrer(articles))
+		print(detecteur.rapport())
+
+	# Mode incrémental : fusion avec le corpus de sortie existant
+	if args.incremental and not args.rebuild and os.path.isfile(args.output):
+		existants = name_to_iterator[output_format](args.output)
+		articles = fusionner(existants, articles)
+		print(f"Articles après fusion avec {args.output}: {len(articles)}")
 	
-	if output_format == 'json':
-		corpus.save_json(args.output)
-	elif output_format == 'xml':
-		corpus.save_xml(args.output)
-	elif output_format in ['pkl', 'pickle']:
-		corpus.save_pickle(args.output)
-	else:
-		print(f"Format de sortie non pris en charge: {output_format}. Utilisation de JSON par défaut.")
-		corpus.save_json(args.output)
-		
-	print(f"Traitement terminé. {len(corpus.articles)} articles ont été écrits dans {args.output}")
+	# Sérialiser le résultat, article par article
+	try:
+		if output_format == 'json':
+			nb_articles = name_to_writer[output_format](articles, args.output, compact=args.compact)
+		else:
+			nb_articles = name_to_writer[output_format](articles, args.output)
+	except Exception as e:
+		# Le manifeste n'est pas mis à jour : les fichiers seront relus à la prochaine exécution
+		print(f"Erreur lors de l'écriture de {args.output}: {e}")
+		sys.exit(1)
+
+	print(f"Traitement terminé. {nb_articles} articles ont été écrits dans {args.output}")
+
+	# Le manifeste n'est mis à jour qu'une fois la sortie écrite
+	if args.incremental:
+		for file in fichiers_traites:
+			manifeste[str(file)] = entrees.get(str(file)) or entree_manifeste(file)
+		# Un fichier illisible est inscrit avec son erreur : il ne sera relu que s'il change
+		for file, erreur in fichiers_en_erreur:
+			manifeste[str(file)] = dict(entrees.get(str(file)) or entree_manifeste(file), erreur=str(erreur))
+		sauvegarder_manifeste(manifeste, chemin_manifeste)
 
 if __name__ == "__main__":
 	main()
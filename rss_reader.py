@@ -2,82 +2,161 @@ import os
 import sys
 import argparse
 import re
+import html
 import xml.etree.ElementTree as ET
-import feedparser
-from pathlib import Path
-from datetime import datetime
-from datastructures import Article, Corpus
+from datastructures import Article, Corpus, borne_date
+from quasi_doublons import DetecteurQuasiDoublons
+
+# Un seul passage sur le fichier : ouvertures/fermetures d'<item> et champs utiles (attributs acceptés) ;
+# le contenu va jusqu'à la balise fermante correspondante, sans retour en arrière.
+# Seuls les préfixes dc: et atom: sont reconnus (<media:title> & co. sont ignorés, comme avec etree)
+_RSS_TOKEN = re.compile(
+	r'<(?P<close>/?)(?:[\w.-]+:)?item\b[^>]*>'
+	r'|<(?:(?P<prefix>dc|atom):)?(?P<tag>title|link|description|pubDate|date|category)\b(?P<attrs>[^>]*?)'
+	r'(?:/>|>(?P<content>[^<]*(?:<(?!/(?:(?P=prefix):)?(?P=tag)\s*>)[^<]*)*)</(?:(?P=prefix):)?(?P=tag)\s*>)',
+	re.S
+)
+_CHAMPS_PREFIXES = {("dc", "date"), ("atom", "link")}
+_CDATA = re.compile(r'<!\[CDATA\[(.*?)\]\]>', re.S)
+_HREF = re.compile(r'\bhref\s*=\s*["\']([^"\']*)["\']')
+_ENCODING = re.compile(rb'^<\?xml[^>]*encoding\s*=\s*["\']([\w.-]+)["\']')
+
+def _texte_xml(content):
+	"""Décode le contenu d'un élément : sections CDATA gardées telles quelles, entités décodées ailleurs"""
+	if not content:
+		return ""
+	if "&" not in content and "<" not in content:
+		return content.strip()
+	if "<![CDATA[" not in content:
+		return html.unescape(content).strip()
+	texte = content.strip()
+	if texte.startswith("<![CDATA[") and texte.endswith("]]>") and texte.find("]]>") == len(texte) - 3:
+		# Cas le plus courant : une seule section CDATA, gardée telle quelle
+		return texte[9:-3].strip()
+	morceaux = []
+	position = 0
+	for cdata in _CDATA.finditer(content):
+		morceaux.append(html.unescape(content[position:cdata.start()]))
+		morceaux.append(cdata.group(1))
+		position = cdata.end()
+	morceaux.append(html.unescape(content[position:]))
+	return "".join(morceaux).strip()
 
 def lire_rss_regex(xml_file):
-	"""Méthode R1 : Extraction avec expressions régulières (Regex)"""
+	"""Méthode R1 : Extraction avec expressions régulières (Regex)
+
+	Le fichier entier est décodé en mémoire : pour une vitesse équivalente, lire_rss_etree
+	(iterparse) reste la méthode recommandée, surtout pour les gros flux.
+	"""
 	
 	articles = []
 
-	with open(xml_file, 'r', encoding="utf-8") as file:
-		content = file.read()
-
-	items = re.findall(r'<item>([\s\S]*?)</item>', content)
-
-	for item in items:
-		id_match = re.search(r'<link>(.*?)</link>', item)
-		title_match = re.search(r'<title>(.*?)</title>', item)
-		desc_match = re.search(r'<description>(.*?)</description>', item)
-		date_match = re.search(r'<pubDate>(.*?)</pubDate>', item)
-		categories = re.findall(r'<category[^>]*>(.*?)</category>', item)
-
-		id_value = id_match.group(1) if id_match else " "
-		title_value = title_match.group(1) if title_match else " "
-		desc_value = desc_match.group(1) if desc_match else " "
-		date_value = date_match.group(1) if date_match else " "
-		categories_value = [", ".join(categories)] if categories else "[]"
-
-		#article = {'id': id_value, 'source': str(xml_file), 'title' : title_value, 'description': desc_value, 'date' : date_value, 'categories': categories_value}
-		article = Article(
-			id=id_value,
-			source=os.path.basename(xml_file),
-			title=title_value,
-			description=desc_value,
-			date=date_value,
-			categories=categories_value
-		)
-		articles.append(article)
+	with open(xml_file, 'rb') as file:
+		data = file.read()
+	encoding = _ENCODING.match(data.lstrip())
+	content = data.decode(encoding.group(1).decode() if encoding else "utf-8", errors="replace")
+	source = os.path.basename(xml_file)
+
+	champs = None  # Champs de l'item en cours, None hors d'un item
+	categories_channel = []
+	# findall construit les tuples de groupes en C (groupes absents : chaînes vides)
+	for close, prefix, tag, attrs, contenu in _RSS_TOKEN.findall(content):
+		if not tag:
+			if close:
+				if champs is not None:
+					articles.append(Article(
+						id=champs.get("link") or champs.get("atom:link") or " ",
+						source=source,
+						title=champs.get("title") or " ",
+						description=champs.get("description") or " ",
+						date=champs.get("pubDate") or champs.get("dc:date") or " ",
+						categories=champs["categories"] or list(categories_channel)
+					))
+				champs = None
+			else:
+				champs = {"categories": []}
+			continue
+		if prefix:
+			if (prefix, tag) not in _CHAMPS_PREFIXES:
+				continue
+			# Rangé à part : l'élément sans préfixe, s'il existe, reste prioritaire
+			tag = f"{prefix}:{tag}"
+		if champs is None:
+			# Champ du channel : seules les catégories servent, à défaut de catégories dans l'item
+			if tag == "category":
+				value = _texte_xml(contenu)
+				if value:
+					categories_channel.append(value)
+			continue
+
+		value = contenu.strip() if "&" not in contenu and "<" not in contenu else _texte_xml(contenu)
+		if tag == "category":
+			if value:
+				champs["categories"].append(value)
+		elif tag not in champs:
+			if tag == "atom:link" and not value:
+				# Lien Atom : <atom:link href="..."/>
+				href = _HREF.search(attrs)
+				value = html.unescape(href.group(1)) if href else ""
+			if value:
+				champs[tag] = value
 
 	return articles
 
 def lire_rss_etree(xml_file):
-	"""Méthode R2 : Extraction avec ElementTree"""
+	"""Méthode R2 : Extraction avec ElementTree (iterparse, mémoire bornée)"""
 
 	articles = []
-	tree = ET.parse(xml_file)
-	root = tree.getroot()
-
-
-	for item in root.iter("item"):
-		id = item.find("link").text if item.find("link") is not None else " "
-		categories = [category.text for category in item.findall("category") if category.text]
-		if categories == [] :
-			for channel in root.iter("channel") :
-				for category in channel.findall("category") :
-					categories.append(category.text)
-		description = item.find("description").text if item.find("description") is not None else " "
-		title = item.find("title").text if item.find("title") is not None else " "
-		date = item.find("pubDate").text if item.find("pubDate") is not None else " "
-
-		#article = {'id': id,  'source' : str(xml_file), 'title': title, 'description': description, 'date' : date, 'categories': categories}
-		article = Article(
-			id=id,
-			source=os.path.basename(xml_file),
-			title=title,
-			description=description,
-			date=date,
-			categories=categories
-		)
-		articles.append(article)
+	source = os.path.basename(xml_file)
+	categories_channel = []  # Catégories de tous les <channel>, collectées une seule fois
+	sans_categories = []  # Articles qui recevront les catégories des channels
+	parents = []  # Pile des éléments ouverts
+
+	for event, elem in ET.iterparse(xml_file, events=("start", "end")):
+		if event == "start":
+			parents.append(elem)
+			continue
+		parents.pop()
+		parent = parents[-1] if parents else None
+
+		if elem.tag == "category" and parent is not None and parent.tag == "channel":
+			categories_channel.append(elem.text)
+		elif elem.tag == "item":
+			# Un seul passage sur les enfants de l'item ; seul le premier de chaque champ compte
+			champs = {}
+			categories = []
+			for child in elem:
+				if child.tag == "category":
+					if child.text:
+						categories.append(child.text)
+				elif child.tag not in champs:
+					champs[child.tag] = child.text
+
+			#article = {'id': id,  'source' : str(xml_file), 'title': title, 'description': description, 'date' : date, 'categories': categories}
+			article = Article(
+				id=champs.get("link", " "),
+				source=source,
+				title=champs.get("title", " "),
+				description=champs.get("description", " "),
+				date=champs.get("pubDate", " "),
+				categories=categories
+			)
+			if not categories:
+				sans_categories.append(article)
+			articles.append(article)
+			# Les éléments déjà traités ne sont plus utiles
+			if parent is not None:
+				parent.clear()
+
+	for article in sans_categories:
+		article.categories = list(categories_channel)
 
 	return articles
 
 def lire_rss_feedparser(xml_file):
 	"""Méthode R3 : Extraction avec feedparser"""
+	# Import différé : les méthodes regex et etree n'ont pas à charger feedparser
+	import feedparser
 
 	articles = []
 	flux = feedparser.parse(xml_file)
@@ -115,75 +194,16 @@ def run_method(method, xml_file):
 	return articles
 
 
-def filtre_date(item: Article, date_debut, date_fin):
-	"""
-	Filtre un article selon une plage de dates.
-	"""
-	if not item.date or not item.date.strip():
-		return False
-
-	try:
-		# Exemple de format : "Wed, 17 Apr 2024 14:35:00 +0000"
-		date = datetime.strptime(item.date, "%a, %d %b %Y %H:%M:%S %z").replace(tzinfo=None)
-	except ValueError:
-		return False
-
-	if date_debut:
-		date_min = datetime.strptime(date_debut, "%Y-%m-%d")
-		if date < date_min:
-			return False
-
-	if date_fin:
-		date_max = datetime.strptime(date_fin, "%Y-%m-%d")
-		if date > date_max:
-			return False
-
-	return True
-
-
-def filtre_source(item:Article, sources:list) :
-	item_source = item.source.lower()
-
-	if not sources:
-		return True
-	
-	return any(s.lower() in item_source for s in sources)
-
-def filtre_categories(item:Article, categories:list) :
-	"""
-	filtrer les articles selon catégories
-	"""
-	if not categories:
-		return True
-	# On découpe le string du categorie par "," et le stoker dans une list
-	if len(item.categories) == 1 :
-		article_categories = item.categories[0].split(", ")
-	else :
-		article_categories = item.categories
-
-	if article_categories:
-		return any(cat in categories for cat in article_categories)
-	return False  # Si pas de catégories, on exclut par défaut
-
 def filtrage(articles, date_debut=None, date_fin=None, sources=None, categories=None):
 	"""Applique tous les filtres spécifiés aux articles"""
 	articles_filtres = []
 	id_unique = set()
+
+	# Les critères sont évalués par intersection des index inversés du corpus (construits une seule fois
+	# par Corpus) ; la plage de dates est une recherche dichotomique dans l'index trié des dates
+	corpus = articles if isinstance(articles, Corpus) else Corpus(list(articles))
 	
-	for article in articles:
-		# Vérifier tous les filtres applicables
-		if date_debut is not None or date_fin is not None:
-			if not filtre_date(article, date_debut, date_fin):
-				continue
-		
-		if sources:
-			if not filtre_source(article, sources):
-				continue
-		
-		if categories:
-			if not filtre_categories(article, categories):
-				continue
-		
+	for article in corpus.query(borne_date(date_debut), borne_date(date_fin), sources, categories):
 		# Si l'article passe tous les filtres et n'est pas un doublon
 		if article.id not in id_unique:
 			id_unique.add(article.id)
@@ -202,6 +222,8 @@ def main():
 	parser.add_argument("--source", nargs="+", help="Filtrer par une ou plusieurs sources")
 	parser.add_argument("--categorie", nargs="+", help="Filtrer par une ou plusieurs catégories")
 	parser.add_argument("--output", "-o", help="Fichier de sortie (format: json, xml, ou pickle)", default="output.json")
+	parser.add_argument("--quasi-doublons", type=float, nargs="?", const=0.8, metavar="SEUIL",
+						help="Supprimer les quasi-doublons (similarité de Jaccard estimée >= SEUIL, 0.8 par défaut)")
 	args = parser.parse_args()
 
 	if not os.path.isfile(args.fichier_entree):
@@ -215,6 +237,11 @@ def main():
 		articles_filtres = filtrage(articles, args.start_date, args.end_date, args.source, args.categorie)
 	else:
 		articles_filtres = articles
+
+	if args.quasi_doublons is not None:
+		detecteur = DetecteurQuasiDoublons(args.quasi_doublons)
+		articles_filtres = list(detecteur.filtrer(articles_filtres))
+		print(detecteur.rapport())
 	
 	corpus = Corpus(articles_filtres)
 	
@@ -5,155 +5,488 @@ LDA Model
 Introduces Gensim's LDA model and demonstrates its use on the NIPS corpus.
 """
 import argparse
+import hashlib
 import logging
 import os
-import re
-import tarfile
+import time
 import json
 import glob
-import xml.etree.ElementTree as ET
-import spacy
-import pickle
-from datastructures import Corpus, Article, Token
-
-import smart_open
-from nltk.tokenize import RegexpTokenizer
-from nltk import download
-from nltk.stem.wordnet import WordNetLemmatizer
-from gensim.models import Phrases, LdaModel
-from gensim.corpora import Dictionary
+import shutil
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from pathlib import Path
+from datastructures import name_to_iterator
+from ressources import stopwords_nltk
 from pprint import pprint
 
-logging.basicConfig(format='%(asctime)s : %(levelname)s : %(message)s', level=logging.INFO)
-
-download('wordnet')
-download('punkt')
-download('stopwords')
-
-from nltk.tokenize import RegexpTokenizer
-from nltk.corpus import stopwords
+# gensim, numpy et nltk sont importés dans les fonctions qui s'en servent : --help et les erreurs
+# d'arguments ne paient pas leur chargement, et aucune ressource n'est téléchargée à l'import
 
-name_to_loader = {"xml" : Corpus.load_xml,
-                  "json": Corpus.load_json,
-                  "pickle": Corpus.load_pickle}
-
-def load_and_tokenize(file, format) -> list[Token]:
-    """Tokenisation des termes du corpus."""
+logging.basicConfig(format='%(asctime)s : %(levelname)s : %(message)s', level=logging.INFO)
 
-    stop_words = set(stopwords.words('french'))  # Liste des mots à ignorer
+STOPWORDS_LANGUAGE = 'french'
+# À incrémenter quand les étapes de prétraitement changent : les artefacts en cache sont alors ignorés
+PREPROCESSING_VERSION = 1
 
-    #Chargement du corpus
+class Flux:
+    """Documents recalculés à chaque parcours : une liste de termes par article, jamais tout le corpus en mémoire.
 
-    docs = name_to_loader[format](file)
+    Dictionary, doc2bow et Phrases parcourent les documents plusieurs fois ; chaque parcours relit le
+    corpus article par article en appliquant les étapes de prétraitement à la volée.
+    """
+    def __init__(self, fabrique):
+        self.fabrique = fabrique
 
-    # Traitement de chaque document
+    def __iter__(self):
+        return iter(self.fabrique())
 
-    docs = [article for article in docs.articles] #Transformer l'objet Corpus en liste d'Article
+def load_and_tokenize(file, format) -> Flux:
+    """Tokenisation des termes du corpus : un document (liste de Token) par article."""
+    #Chargement du corpus en flux : les Article sont lus un par un
+    return tokenize_articles(Flux(lambda: name_to_iterator[format](file)))
 
-    # Filtrage des mots :
-    docs = [article.tokens for article in docs]  #Récupérer chaque liste de tokens de chaque article
+def tokenize_articles(articles) -> Flux:
+    """Tokenisation d'articles déjà chargés (articles doit pouvoir être parcouru plusieurs fois)."""
 
-    docs = [token for tokens in docs for token in tokens] # Transformer la liste de liste de tokens en liste de tokens
-                                                                            # Autrement dit regrouper tous les tokens de tous les articles ensemble
-    docs = [token for token in docs if token.text.isalnum() and token.text not in stop_words]  # Garder les mots alphanumériques et non-stopwords
+    stop_words = set(stopwords_nltk(STOPWORDS_LANGUAGE))  # Liste des mots à ignorer
 
-    # Suppression des nombres et des mots d'une seule lettre
-    docs = [token for token in docs if not token.text.isnumeric() and len(token.text) > 1]
+    def documents():
+        for article in articles:
+            # Garder les mots alphanumériques et non-stopwords,
+            # sans les nombres ni les mots d'une seule lettre
+            yield [token for token in article.tokens
+                   if token.text.isalnum() and token.text not in stop_words
+                   and not token.text.isnumeric() and len(token.text) > 1]
 
-    return docs
+    return Flux(documents)
 
 def filter_by_pos(docs, allowed_pos):
     """Filtrer sur les catégories grammaticales"""
-
-    filtered_docs = []
-
-    filtered = [token for token in docs if token.pos in allowed_pos]
-    filtered_docs.append(filtered)
-
-    return filtered_docs
+    allowed_pos = set(allowed_pos)
+    return Flux(lambda: ([token for token in doc if token.pos in allowed_pos] for doc in docs))
 
 def lemmatize(docs):
     """Lemmatisation des documents."""
-    
-    lemmatized_docs = [[token.lemma for token in doc] for doc in docs]
-    return lemmatized_docs
+    return Flux(lambda: ([token.lemma for token in doc if token.lemma] for doc in docs))
 
 def get_text_tokens(docs):
     """Récupère le mot-forme du token"""
-    docs = [[token.text for token in doc] for doc in docs]
-    return docs
+    return Flux(lambda: ([token.text for token in doc] for doc in docs))
 
-def bigrams(docs):
-    """Ajout des bigrammes aux documents."""
-    bigram = Phrases(docs, min_count=20)
-    new_docs = []  # Liste pour stocker les documents modifiés
+def train_phrases(docs, min_count=20):
+    """Apprend les bigrammes en un parcours et retourne le modèle figé."""
+    from gensim.models import Phrases
+    return Phrases(docs, min_count=min_count).freeze()
 
-    for doc in docs:
-        new_doc = doc + [token for token in bigram[doc] if "_" in token]
-        new_docs.append(new_doc)
+def bigrams(docs, phrases):
+    """Ajout des bigrammes aux documents."""
+    return Flux(lambda: (doc + [token for token in phrases[doc] if "_" in token] for doc in docs))
 
-    return new_docs
+def build_bow(docs, corpus_file=None):
+    """Construit le dictionnaire et le corpus BoW.
 
-def train_lda(docs):
-    """Entraîne un modèle LDA."""
+    Avec corpus_file, le corpus BoW est sérialisé une fois au format Matrix Market puis relu en flux
+    depuis le disque à chaque passe : docs doit alors pouvoir être parcouru plusieurs fois.
+    """
+    from gensim.corpora import Dictionary, MmCorpus
     dictionary = Dictionary(docs)
     #dictionary.filter_extremes(no_below=20, no_above=0.5)
-    corpus = [dictionary.doc2bow(doc) for doc in docs]
-
-    model = LdaModel(
+    if corpus_file:
+        MmCorpus.serialize(corpus_file, (dictionary.doc2bow(doc) for doc in docs))
+        corpus = MmCorpus(corpus_file)
+    else:
+        corpus = [dictionary.doc2bow(doc) for doc in docs]
+    return dictionary, corpus
+
+def train_lda(dictionary, corpus, workers=1, num_topics=10, random_state=None):
+    """Entraîne un modèle LDA.
+
+    Avec workers > 1, l'entraînement utilise LdaMulticore (alpha symétrique, 'auto' n'y est pas disponible).
+    """
+    from gensim.models import LdaModel, LdaMulticore
+    params = dict(
         corpus=corpus,
         id2word=dictionary,
         chunksize=2000,
-        alpha='auto',
         eta='auto',
         iterations=400,
-        num_topics=10,
+        num_topics=num_topics,
         passes=20,
-        eval_every=None
+        eval_every=None,
+        random_state=random_state
     )
+    if workers > 1:
+        model = LdaMulticore(workers=workers, alpha='symmetric', **params)
+    else:
+        model = LdaModel(alpha='auto', **params)
     print(f"Taille du dictionnaire après filtrage : {len(dictionary)}")
     print(f"Taille du corpus : {len(corpus)}")
 
-    return model, dictionary, corpus
-
-def main():
-    parser = argparse.ArgumentParser(description="Topic modeling")
-    parser.add_argument("file", help="Chemin du fichier/dossier contenant le corpus")
-    parser.add_argument("format", choices=["json", "xml", "pickle"], help="Format du corpus")
-    parser.add_argument("methode", choices=["lemme", "mot-forme"], help="Choix entre lemme ou mot-forme")
-    parser.add_argument("-p", "--pos", help="Catégories grammaticales à considérer, en majuscules; exemple : VERB NOUN PRON", nargs="*" )
-    args = parser.parse_args()
+    return model
 
-    docs_tokenized = load_and_tokenize(args.file, args.format)
-    if not docs_tokenized:
+def average_coherence(model, corpus):
+    """Cohérence moyenne (u_mass) des thèmes du modèle, avec les thèmes triés par cohérence"""
+    top_topics = model.top_topics(corpus)
+    return sum(t[1] for t in top_topics) / len(top_topics), top_topics
+
+def topic_counts(values):
+    """Nombres de thèmes à essayer : entiers ou intervalles inclusifs 'début:fin[:pas]'"""
+    counts = []
+    for value in values:
+        if ":" in value:
+            start, end, *step = (int(v) for v in value.split(":"))
+            counts.extend(range(start, end + 1, step[0] if step else 1))
+        else:
+            counts.append(int(value))
+    return sorted(set(counts))
+
+_sweep_dictionary = None
+_sweep_corpus = None
+
+def _init_sweep_worker(dictionary, corpus):
+    # Le corpus prétraité est transmis une seule fois par processus, pas à chaque entraînement
+    global _sweep_dictionary, _sweep_corpus
+    _sweep_dictionary, _sweep_corpus = dictionary, corpus
+
+def _sweep_run(num_topics, seed, models_directory):
+    """Entraîne et évalue un modèle dans un processus du balayage ; le modèle est sauvegardé sur le disque"""
+    start = time.perf_counter()
+    model = train_lda(_sweep_dictionary, _sweep_corpus, num_topics=num_topics, random_state=seed)
+    coherence, _ = average_coherence(model, _sweep_corpus)
+    path = Path(models_directory) / f"lda_k{num_topics}_s{seed}"
+    model.save(str(path))
+    return {"num_topics": num_topics, "seed": seed, "coherence": coherence,
+            "seconds": round(time.perf_counter() - start, 1), "model": str(path)}
+
+def sweep(dictionary, corpus, counts, seeds, output_directory, workers=1, patience=0, min_delta=0.0):
+    """Balayage des nombres de thèmes et des graines dans un pool de processus.
+
+    Les nombres de thèmes sont évalués dans l'ordre croissant ; avec patience > 0, le balayage s'arrête
+    quand la cohérence moyenne (sur les graines) ne progresse plus d'au moins min_delta pendant
+    patience nombres de thèmes consécutifs. Retourne les résultats classés par cohérence décroissante.
+    """
+    output_directory = Path(output_directory)
+    models_directory = output_directory / "models"
+    models_directory.mkdir(parents=True, exist_ok=True)
+
+    pending = [(num_topics, seed) for num_topics in counts for seed in seeds]
+    pending.reverse()
+    results = {num_topics: [] for num_topics in counts}
+    best, stale, next_count, stopped = None, 0, 0, False
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_sweep_worker,
+                             initargs=(dictionary, corpus)) as executor:
+        # Fenêtre bornée de travaux en cours, pour pouvoir s'arrêter tôt sans tout avoir soumis
+        running = set()
+        while pending or running:
+            while pending and not stopped and len(running) < workers:
+                running.add(executor.submit(_sweep_run, *pending.pop(), str(models_directory)))
+            if not running:
+                break
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                results[result["num_topics"]].append(result)
+                print(f"k={result['num_topics']} seed={result['seed']} : cohérence {result['coherence']:.4f}")
+
+            # Critère d'arrêt évalué sur les nombres de thèmes terminés, dans l'ordre
+            while not stopped and next_count < len(counts) and len(results[counts[next_count]]) == len(seeds):
+                mean = sum(r["coherence"] for r in results[counts[next_count]]) / len(seeds)
+                if best is None or mean > best + min_delta:
+                    best, stale = mean, 0
+                else:
+                    stale += 1
+                next_count += 1
+                if patience and stale >= patience:
+                    stopped = True
+                    print(f"Cohérence stable depuis {stale} nombres de thèmes : arrêt du balayage")
+
+    ranking = sorted((r for runs in results.values() for r in runs), key=lambda r: r["coherence"], reverse=True)
+    if not ranking:
+        return ranking
+
+    # Seul le meilleur modèle est conservé
+    def model_files(path):
+        # model.save écrit le fichier principal et, à côté, les grands tableaux numpy (path.*)
+        return [path] + glob.glob(glob.escape(path) + ".*")
+
+    best_path = output_directory / "best_model"
+    for result in ranking[1:]:
+        for file in model_files(result["model"]):
+            os.remove(file)
+    for file in model_files(ranking[0]["model"]):
+        os.replace(file, str(best_path) + file[len(ranking[0]["model"]):])
+    ranking[0]["model"] = str(best_path)
+    for result in ranking[1:]:
+        result["model"] = None
+
+    report = {"counts": counts, "seeds": seeds, "patience": patience, "min_delta": min_delta,
+              "stopped_early": stopped, "ranking": ranking}
+    with open(output_directory / "report.json", "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=4)
+    return ranking
+
+def corpus_hash(file, chunk_size=1 << 20) -> str:
+    """Empreinte SHA-256 du contenu du fichier de corpus"""
+    digest = hashlib.sha256()
+    with open(file, 'rb') as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def preprocessing_options(file, format, methode, pos, min_count) -> dict:
+    """Tout ce dont dépendent les artefacts de prétraitement : corpus, méthode, POS, stopwords et seuil des bigrammes"""
+    stop_words = sorted(stopwords_nltk(STOPWORDS_LANGUAGE))
+    return {
+        "version": PREPROCESSING_VERSION,
+        "corpus": corpus_hash(file),
+        "format": format,
+        "methode": methode,
+        "pos": sorted(set(pos)) if pos else None,
+        "stopwords": [STOPWORDS_LANGUAGE, hashlib.sha256("\n".join(stop_words).encode("utf-8")).hexdigest()],
+        "bigram_min_count": min_count,
+    }
+
+def preprocessing_key(options: dict) -> str:
+    return hashlib.sha256(json.dumps(options, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+def save_artifacts(directory: Path, options: dict, docs, phrases, in_memory=True):
+    """Sérialise les bigrammes figés, le dictionnaire et le corpus BoW dans directory.
+
+    Les artefacts sont écrits dans un dossier temporaire renommé à la fin : un prétraitement
+    interrompu ne laisse jamais de cache incomplet.
+    """
+    tmp = directory.with_name(directory.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    phrases.save(str(tmp / "phrases.pkl"))
+    dictionary, _ = build_bow(docs, str(tmp / "corpus.mm"))
+    dictionary.save(str(tmp / "dictionary.dict"))
+    with open(tmp / "options.json", "w", encoding="utf-8") as f:
+        json.dump(options, f, ensure_ascii=False, indent=4)
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(tmp, directory)
+    return load_artifacts(directory, in_memory)
+
+def load_artifacts(directory: Path, in_memory=True):
+    """Recharge (phrases, dictionary, corpus) depuis le cache, ou None s'il n'existe pas.
+
+    Sans in_memory, le corpus BoW reste sur le disque et est relu en flux à chaque passe.
+    """
+    from gensim.corpora import Dictionary, MmCorpus
+    from gensim.models.phrases import FrozenPhrases
+    if not (directory / "options.json").exists():
+        return None
+    phrases = FrozenPhrases.load(str(directory / "phrases.pkl"))
+    dictionary = Dictionary.load(str(directory / "dictionary.dict"))
+    corpus = MmCorpus(str(directory / "corpus.mm"))
+    if in_memory:
+        corpus = list(corpus)
+    return phrases, dictionary, corpus
+
+def preprocess(file, format, methode, pos=None):
+    """Chaîne de prétraitement : tokenisation, filtrage POS puis lemmes ou mots-formes"""
+    return preprocess_documents(load_and_tokenize(file, format), methode, pos)
+
+def preprocess_documents(docs_tokenized, methode, pos=None):
+    """Filtrage POS puis lemmes ou mots-formes de documents déjà tokenisés"""
+    if next(iter(docs_tokenized), None) is None:
         raise ValueError("Aucun document extrait. Vérifiez votre fichier/dossier.")
 
-    print("Taille du corpus :", len(docs_tokenized))
-    print(f"Methode choisis : {args.methode}")
-    #print(docs[0][:500])
-
     #filtrer sur les catégories grammaticales ( ne prendre que les noms et les verbes par exemple)
-    if args.pos :
-        docs_processed = filter_by_pos(docs_tokenized, args.pos)
+    docs_processed = docs_tokenized
+    if pos :
+        docs_processed = filter_by_pos(docs_tokenized, pos)
 
     #Lemmatisation ou extractiond des mots-formes:
-    if args.methode == "lemme" :
+    if methode == "lemme" :
           docs_processed = lemmatize(docs_processed)
     
-    elif args.methode == "mot-forme" :
+    elif methode == "mot-forme" :
         docs_processed = get_text_tokens(docs_processed)
 
-    #Bigrammes :
-    docs_bigrams = bigrams(docs_processed)
+    return docs_processed
+
+def save_model(directory: Path, model, dictionary, phrases, options: dict, history=()):
+    """Sauvegarde le modèle, le dictionnaire, les bigrammes figés et les options de prétraitement"""
+    directory.mkdir(parents=True)
+    model.save(str(directory / "model.lda"))
+    dictionary.save(str(directory / "dictionary.dict"))
+    phrases.save(str(directory / "phrases.pkl"))
+    with open(directory / "model.json", "w", encoding="utf-8") as f:
+        json.dump({"options": options, "history": list(history)}, f, ensure_ascii=False, indent=4)
+
+def load_model(directory: Path):
+    """Recharge (model, dictionary, phrases, meta) sauvegardés par save_model"""
+    from gensim.corpora import Dictionary
+    from gensim.models import LdaModel
+    from gensim.models.phrases import FrozenPhrases
+    with open(directory / "model.json", encoding="utf-8") as f:
+        meta = json.load(f)
+    model = LdaModel.load(str(directory / "model.lda"))
+    dictionary = Dictionary.load(str(directory / "dictionary.dict"))
+    phrases = FrozenPhrases.load(str(directory / "phrases.pkl"))
+    return model, dictionary, phrases, meta
+
+def publish_model(model_dir: Path, *state, history=()):
+    """Publie un nouvel état du modèle dans model_dir/current ; l'état remplacé devient model_dir/previous.
+
+    Le nouvel état est écrit à part puis échangé par renommage : une mise à jour interrompue
+    laisse l'état courant intact.
+    """
+    current, previous, new = model_dir / "current", model_dir / "previous", model_dir / "next"
+    shutil.rmtree(new, ignore_errors=True)
+    save_model(new, *state, history=history)
+    if current.exists():
+        shutil.rmtree(previous, ignore_errors=True)
+        os.replace(current, previous)
+    os.replace(new, current)
+
+def rollback_model(model_dir: Path):
+    """Revient à l'état précédent du modèle (un seul niveau)"""
+    current, previous = model_dir / "current", model_dir / "previous"
+    if not previous.exists():
+        print(f"Aucun état précédent dans {model_dir}")
+        return False
+    shutil.rmtree(current, ignore_errors=True)
+    os.replace(previous, current)
+    return True
+
+def grow_vocabulary(model, dictionary):
+    """Étend les matrices thèmes-mots du modèle aux nouveaux termes du dictionnaire.
+
+    LdaModel ne gère pas l'ajout de vocabulaire : les statistiques suffisantes des nouveaux termes
+    partent de zéro, et leur prior eta de la moyenne des termes existants.
+    """
+    import numpy as np
+    added = len(dictionary) - model.num_terms
+    if added <= 0:
+        return 0
+    sstats = model.state.sstats
+    model.state.sstats = np.hstack([sstats, np.zeros((sstats.shape[0], added), dtype=sstats.dtype)])
+    eta = np.asarray(model.eta)
+    if eta.ndim == 1:
+        model.eta = np.concatenate([eta, np.full(added, eta.mean(), dtype=eta.dtype)])
+        model.state.eta = model.eta
+    model.num_terms = len(dictionary)
+    model.id2word = dictionary
+    model.sync_state()
+    return added
+
+def update_lda(model_dir: Path, file, format):
+    """Intègre un nouveau lot d'articles au modèle publié dans model_dir, par mise à jour en ligne.
+
+    Le prétraitement (méthode, POS, bigrammes) est celui de l'entraînement initial ; seul le nouveau
+    lot est parcouru, le coût ne dépend donc pas de la taille de l'archive.
+    """
+    model, dictionary, phrases, meta = load_model(model_dir / "current")
+    options = meta["options"]
+    docs = bigrams(preprocess(file, format, options["methode"], options["pos"]), phrases)
+
+    dictionary.add_documents(docs)
+    added = grow_vocabulary(model, dictionary)
+    corpus = [dictionary.doc2bow(doc) for doc in docs]
+    model.update(corpus)
+
+    history = meta["history"] + [{"file": str(file), "documents": len(corpus), "new_terms": added,
+                                  "date": time.strftime("%Y-%m-%dT%H:%M:%S")}]
+    publish_model(model_dir, model, dictionary, phrases, options, history=history)
+    print(f"{len(corpus)} documents intégrés, {added} nouveaux termes (dictionnaire : {len(dictionary)})")
+    return model, corpus
+
+def main():
+    parser = argparse.ArgumentParser(description="Topic modeling")
+    parser.add_argument("file", nargs="?", help="Chemin du fichier/dossier contenant le corpus")
+    parser.add_argument("format", nargs="?", choices=["json", "xml", "pickle", "binary"], help="Format du corpus")
+    parser.add_argument("methode", nargs="?", choices=["lemme", "mot-forme"], help="Choix entre lemme ou mot-forme")
+    parser.add_argument("-p", "--pos", help="Catégories grammaticales à considérer, en majuscules; exemple : VERB NOUN PRON", nargs="*" )
+    parser.add_argument("-w", "--workers", type=int, default=1, help="Nombre de processus d'entraînement (LdaMulticore si > 1)")
+    parser.add_argument("--out-of-core", metavar="FICHIER_MM",
+                        help="Entraîner depuis le corpus BoW sur le disque (ce fichier Matrix Market avec --no-cache, celui du cache sinon)")
+    parser.add_argument("-k", "--num-topics", nargs="+", default=["10"],
+                        help="Nombre(s) de thèmes ; plusieurs valeurs ou un intervalle 'début:fin[:pas]' lancent un balayage")
+    parser.add_argument("--seeds", type=int, nargs="+", help="Graines aléatoires du balayage (une par entraînement)")
+    parser.add_argument("--sweep-dir", default="lda_sweep", help="Dossier du rapport et du meilleur modèle du balayage")
+    parser.add_argument("--patience", type=int, default=0,
+                        help="Arrêter le balayage après ce nombre de nombres de thèmes sans gain de cohérence (0 : jamais)")
+    parser.add_argument("--min-delta", type=float, default=0.0, help="Gain minimal de cohérence pour le critère d'arrêt")
+    parser.add_argument("--bigram-min-count", type=int, default=20, help="Nombre minimal d'occurrences d'un bigramme")
+    parser.add_argument("--cache-dir", default="lda_cache",
+                        help="Dossier des artefacts de prétraitement (bigrammes, dictionnaire, corpus BoW)")
+    parser.add_argument("--no-cache", action="store_true", help="Refaire tout le prétraitement sans lire ni écrire le cache")
+    parser.add_argument("--model-dir", type=Path,
+                        help="Dossier du modèle persistant : sauvegarde après l'entraînement, source de --update")
+    parser.add_argument("--update", action="store_true",
+                        help="Intégrer le fichier (nouveaux articles) au modèle de --model-dir au lieu de réentraîner")
+    parser.add_argument("--rollback", action="store_true", help="Restaurer l'état du modèle avant la dernière mise à jour")
+    args = parser.parse_args()
+
+    if (args.update or args.rollback) and not args.model_dir:
+        parser.error("--update et --rollback nécessitent --model-dir")
+    if args.rollback:
+        if rollback_model(args.model_dir):
+            print(f"Modèle restauré : {args.model_dir / 'current'}")
+        return
+    if args.file is None or args.format is None or (args.methode is None and not args.update):
+        parser.error("file, format et methode sont requis (methode est relue du modèle avec --update)")
+
+    if args.update:
+        model, corpus = update_lda(args.model_dir, args.file, args.format)
+        avg_topic_coherence, top_topics = average_coherence(model, corpus)
+        print(f'Average topic coherence (nouveaux articles): {avg_topic_coherence:.4f}')
+        pprint(top_topics)
+        return
+
+    print(f"Methode choisis : {args.methode}")
+
+    artifacts = None
+    options = {"methode": args.methode, "pos": args.pos, "bigram_min_count": args.bigram_min_count}
+    if not args.no_cache:
+        options = preprocessing_options(args.file, args.format, args.methode, args.pos, args.bigram_min_count)
+        cache_directory = Path(args.cache_dir) / preprocessing_key(options)
+        artifacts = load_artifacts(cache_directory, in_memory=not args.out_of_core)
+        if artifacts is not None:
+            print(f"Prétraitement relu depuis le cache : {cache_directory}")
+
+    if artifacts is None:
+        docs_processed = preprocess(args.file, args.format, args.methode, args.pos)
+
+        #Bigrammes :
+        phrases = train_phrases(docs_processed, args.bigram_min_count)
+        docs_bigrams = bigrams(docs_processed, phrases)
+
+        if args.no_cache:
+            dictionary, corpus = build_bow(docs_bigrams, corpus_file=args.out_of_core)
+        else:
+            phrases, dictionary, corpus = save_artifacts(cache_directory, options, docs_bigrams, phrases,
+                                                   in_memory=not args.out_of_core)
+            print(f"Prétraitement mis en cache : {cache_directory}")
+    else:
+        phrases, dictionary, corpus = artifacts
 
-    #Modèle LDA :
-    model, dictionary, corpus = train_lda(docs_bigrams)
     if len(dictionary) == 0 or len(corpus) == 0:
         raise ValueError(" !!! Erreur : Le dictionnaire ou le corpus est vide après filtrage !")
 
+    counts = topic_counts(args.num_topics)
+    seeds = args.seeds or [None]
+    if len(counts) > 1 or len(seeds) > 1:
+        #Balayage : les processus se partagent les entraînements (workers désigne alors la taille du pool)
+        ranking = sweep(dictionary, corpus, counts, seeds, args.sweep_dir, workers=args.workers,
+                        patience=args.patience, min_delta=args.min_delta)
+        print(f"Rapport du balayage : {Path(args.sweep_dir) / 'report.json'}")
+        for result in ranking[:5]:
+            print(f"k={result['num_topics']} seed={result['seed']} : cohérence {result['coherence']:.4f}")
+        from gensim.models import LdaModel
+        model = LdaModel.load(ranking[0]["model"])
+    else:
+        #Modèle LDA :
+        model = train_lda(dictionary, corpus, workers=args.workers, num_topics=counts[0], random_state=seeds[0])
+
+    if args.model_dir:
+        publish_model(args.model_dir, model, dictionary, phrases, options)
+        print(f"Modèle sauvegardé : {args.model_dir / 'current'}")
+
     #Affichage des résultats
-    top_topics = model.top_topics(corpus)
-    avg_topic_coherence = sum([t[1] for t in top_topics]) / 10
+    avg_topic_coherence, top_topics = average_coherence(model, corpus)
     print(f'Average topic coherence: {avg_topic_coherence:.4f}')
     pprint(top_topics)
 
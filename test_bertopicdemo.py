@@ -0,0 +1,31 @@
+from collections import Counter
+
+from bertopicdemo import stratified_sample
+
+
+def _effectifs(strata, sample):
+    return Counter(strata[index] for index in sample)
+
+
+def test_stratified_sample_proportionnel():
+    strata = ["a"] * 600 + ["b"] * 300 + ["c"] * 100
+    sample = stratified_sample(strata, 100)
+    assert len(sample) == len(set(sample)) == 100
+    assert _effectifs(strata, sample) == {"a": 60, "b": 30, "c": 10}
+
+
+def test_stratified_sample_plus_fort_reste():
+    # Quotas exacts 4.6, 3.7 et 1.7 : les deux plus forts restes reçoivent le document supplémentaire
+    strata = ["a"] * 46 + ["b"] * 37 + ["c"] * 17
+    assert _effectifs(strata, stratified_sample(strata, 10)) == {"a": 4, "b": 4, "c": 2}
+
+
+def test_stratified_sample_petites_strates():
+    # Les petites strates gardent un document, repris aux strates dont le quota est le plus surévalué
+    strata = ["a"] * 980 + ["b"] * 10 + ["c"] * 5 + ["d"] * 5
+    effectifs = _effectifs(strata, stratified_sample(strata, 20))
+    assert effectifs == {"a": 17, "b": 1, "c": 1, "d": 1}
+
+
+def test_stratified_sample_taille_superieure():
+    assert stratified_sample(["a", "b"], 5) == [0, 1]